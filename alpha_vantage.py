@@ -0,0 +1,268 @@
+import asyncio
+import json
+import math
+import aiohttp
+from cache import SingleFlight, TTLCache
+from metrics import metrics
+from ratelimit import DEFAULT_PRIORITY, QUOTE_PRIORITY, RateLimiter, RateLimitExceeded
+
+ALPHA_VANTAGE_URL = 'https://www.alphavantage.co/query'
+
+# How long (in seconds) a successful response stays fresh, per Alpha Vantage function
+CACHE_TTLS = {
+    'GLOBAL_QUOTE': 15,
+    'CURRENCY_EXCHANGE_RATE': 15,
+    'TIME_SERIES_INTRADAY': 5 * 60,
+    'TIME_SERIES_DAILY': 6 * 60 * 60,
+    'OVERVIEW': 24 * 60 * 60,
+}
+
+# Payload keys Alpha Vantage uses for errors and throttling, never cached
+ERROR_KEYS = ('Error Message', 'Note', 'Information')
+
+# Cheap quote lookups jump ahead of chart and overview fetches in the rate limiter queue
+PRIORITIES = {
+    'GLOBAL_QUOTE': QUOTE_PRIORITY,
+    'CURRENCY_EXCHANGE_RATE': QUOTE_PRIORITY,
+    'REALTIME_BULK_QUOTES': QUOTE_PRIORITY,
+}
+
+# REALTIME_BULK_QUOTES (premium keys only) takes up to this many comma separated symbols
+BULK_QUOTE_LIMIT = 100
+
+# Throttled calls are retried after 15s, 30s, ... before giving up
+THROTTLE_RETRIES = 2
+THROTTLE_BACKOFF = 15
+
+
+class AlphaVantageError(Exception):
+    """Raised when Alpha Vantage can't be reached or doesn't answer with a 200."""
+
+
+class AlphaVantageThrottled(AlphaVantageError):
+    """Raised when we're over the Alpha Vantage rate limit and shouldn't keep waiting."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Alpha Vantage rate limit reached, retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+def is_throttled(data):
+    """Alpha Vantage answers over-limit calls with a 200 and a Note/Information message."""
+    if 'Note' in data:
+        return True
+    message = str(data.get('Information', '')).lower()
+    return 'rate limit' in message or 'call frequency' in message
+
+
+class AlphaVantageClient:
+    """Async Alpha Vantage client sharing one pooled keep-alive session.
+
+    Call `start()` once the event loop is running (e.g. from `on_ready`) and
+    `close()` on shutdown. Every request gets its own timeout and at most
+    `max_concurrency` requests are in flight at once. Successful responses are
+    kept in `cache` for as long as the function's `CACHE_TTLS` entry allows.
+    Upstream calls take their turn from `limiter`, and throttle responses are
+    retried with backoff. Set `bulk_quotes` if the key can use
+    REALTIME_BULK_QUOTES, so `quotes()` can fetch many symbols in one call.
+    `full_history` is cleared once the key turns out not to be allowed
+    outputsize=full daily series.
+    `url` points the client at a stand-in server, such as the one in
+    `benchmarks/fake_alpha_vantage.py`.
+    """
+
+    def __init__(self, api_key, timeout=10, max_connections=10, max_concurrency=5, cache=None, limiter=None, bulk_quotes=False, url=ALPHA_VANTAGE_URL):
+        self.api_key = api_key
+        self.url = url
+        self.bulk_quotes = bulk_quotes
+        self.full_history = True
+        self.cache = cache if cache is not None else TTLCache(maxsize=512)
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self._in_flight = SingleFlight()
+        self._priorities = {}  # key -> most urgent priority among callers of an in-flight fetch
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    @property
+    def started(self):
+        return self._session is not None and not self._session.closed
+
+    async def start(self):
+        # on_ready can fire again after a reconnect, so only open the session once
+        if self.started:
+            return
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.started:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def cache_key(function, params):
+        symbol = params.get('symbol', params.get('from_currency'))
+        rest = tuple(sorted((k, v) for k, v in params.items() if k not in ('symbol', 'from_currency')))
+        return (function, symbol, rest)
+
+    def estimated_wait(self, function, **params):
+        """Seconds a query for `function` would wait on the rate limit, or 0 if it's cached."""
+        if params and self.cache_key(function, params) in self.cache:
+            return 0
+        return self.limiter.estimated_wait(PRIORITIES.get(function, DEFAULT_PRIORITY))
+
+    def estimated_quotes_wait(self, symbols):
+        """Seconds `quotes(symbols)` would wait on the rate limit for the quotes that aren't cached."""
+        missing = sum(1 for symbol in symbols if self.cache_key('GLOBAL_QUOTE', {'symbol': symbol}) not in self.cache)
+        if not missing:
+            return 0
+        calls = math.ceil(missing / BULK_QUOTE_LIMIT) if self.bulk_quotes else missing
+        return self.limiter.estimated_wait(PRIORITIES['GLOBAL_QUOTE'], calls=calls)
+
+    async def query(self, function, cache=True, refresh=False, priority=None, **params):
+        """Call `function` with `params` and return the decoded JSON payload.
+
+        Fresh cached responses are returned without a network round-trip, and
+        concurrent identical queries share a single request. Pass `cache=False`
+        for payloads the caller keeps elsewhere, such as full daily histories,
+        or `refresh=True` to skip the cached copy but still store the new one.
+        `priority` overrides the function's place in the rate limiter queue.
+        """
+        key = self.cache_key(function, params)
+        if cache and not refresh:
+            data = self.cache.get(key)
+            if data is not None:
+                metrics.count('cache_hit', key[1])
+                return data
+            metrics.count('cache_miss', key[1])
+
+        if priority is None:
+            priority = PRIORITIES.get(function, DEFAULT_PRIORITY)
+        if key not in self._in_flight:
+            self._priorities[key] = priority
+        elif priority < self._priorities.get(key, priority):
+            # A more urgent caller (e.g. a user behind a background refresh) joins, so the shared fetch moves up the queue
+            self._priorities[key] = priority
+            self.limiter.promote(key, priority)
+        return await self._in_flight.do(key, lambda: self._fetch_and_cache(key, function, params, cache))
+
+    async def _fetch_and_cache(self, key, function, params, cache):
+        try:
+            data = await self._fetch(key, function, params)
+        finally:
+            self._priorities.pop(key, None)
+        ttl = CACHE_TTLS.get(function)
+        if cache and ttl and not any(k in data for k in ERROR_KEYS):
+            self.cache.set(key, data, ttl)
+        return data
+
+    async def quotes(self, symbols):
+        """Return `{symbol: 'Global Quote' dict or None}` for every symbol in `symbols`.
+
+        Cached quotes are used as they are. The rest come from REALTIME_BULK_QUOTES
+        when `bulk_quotes` is set, otherwise from concurrent GLOBAL_QUOTE calls
+        over the shared session. Symbols that fail come back as the
+        `AlphaVantageError` raised for them, so callers can tell a throttled
+        symbol from one without data; if every one of them fails, the first
+        error is raised.
+        """
+        results = {}
+        missing = []
+        for symbol in symbols:
+            data = self.cache.get(self.cache_key('GLOBAL_QUOTE', {'symbol': symbol}))
+            if data is not None:
+                metrics.count('cache_hit', symbol)
+                results[symbol] = data.get('Global Quote') or None
+            else:
+                missing.append(symbol)
+
+        if missing and self.bulk_quotes:
+            for start in range(0, len(missing), BULK_QUOTE_LIMIT):
+                results.update(await self._bulk_quotes(missing[start:start + BULK_QUOTE_LIMIT]))
+            missing = [symbol for symbol in missing if symbol not in results]
+
+        if missing:
+            responses = await asyncio.gather(*(self.query('GLOBAL_QUOTE', symbol=symbol) for symbol in missing), return_exceptions=True)
+            errors = [response for response in responses if isinstance(response, Exception)]
+            if len(errors) == len(symbols):
+                raise errors[0]
+            for symbol, response in zip(missing, responses):
+                results[symbol] = response if isinstance(response, Exception) else response.get('Global Quote') or None
+
+        return {symbol: results.get(symbol) for symbol in symbols}
+
+    async def _bulk_quotes(self, symbols):
+        # Quotes are cached one symbol at a time, so the batch itself isn't
+        data = await self.query('REALTIME_BULK_QUOTES', cache=False, symbol=','.join(symbols))
+        if not isinstance(data.get('data'), list):
+            # Not a premium key, so stop trying and let the caller fall back to GLOBAL_QUOTE
+            if 'Error Message' not in data:
+                self.bulk_quotes = False
+            return {}
+
+        results = {}
+        for item in data['data']:
+            symbol = str(item.get('symbol', '')).upper()
+            if symbol not in symbols or not item.get('close'):
+                continue
+            # Store it the way GLOBAL_QUOTE would have returned it so /stock_price benefits too
+            quote = {
+                '01. symbol': symbol,
+                '02. open': item.get('open'),
+                '03. high': item.get('high'),
+                '04. low': item.get('low'),
+                '05. price': item['close'],
+                '06. volume': item.get('volume'),
+                '07. latest trading day': str(item.get('timestamp', ''))[:10],
+                '08. previous close': item.get('previous_close'),
+                '09. change': item.get('change'),
+                '10. change percent': item.get('change_percent'),
+            }
+            self.cache.set(self.cache_key('GLOBAL_QUOTE', {'symbol': symbol}), {'Global Quote': quote}, CACHE_TTLS['GLOBAL_QUOTE'])
+            results[symbol] = quote
+        return results
+
+    async def _fetch(self, key, function, params):
+        symbol = key[1]
+        for attempt in range(THROTTLE_RETRIES + 1):
+            try:
+                with metrics.timer('rate_limit_wait'):
+                    await self.limiter.acquire(self._priorities.get(key, DEFAULT_PRIORITY), key=key)
+            except RateLimitExceeded as e:
+                metrics.count('throttled', symbol)
+                raise AlphaVantageThrottled(e.retry_after) from e
+
+            data = await self._request(function, params)
+            if not is_throttled(data):
+                return data
+
+            metrics.count('throttled', symbol)
+            # Everyone else is about to be throttled too, so drain the bucket before backing off
+            self.limiter.throttled()
+            delay = THROTTLE_BACKOFF * 2 ** attempt
+            if attempt == THROTTLE_RETRIES:
+                raise AlphaVantageThrottled(delay)
+            await asyncio.sleep(delay)
+
+    async def _request(self, function, params):
+        if not self.started:
+            await self.start()
+
+        symbol = self.cache_key(function, params)[1]
+        params = {'function': function, **params, 'apikey': self.api_key}
+        async with self._semaphore:
+            try:
+                with metrics.timer('alpha_vantage'):
+                    async with self._session.get(self.url, params=params, timeout=self.timeout) as response:
+                        if response.status != 200:
+                            metrics.count('upstream_error', symbol)
+                            raise AlphaVantageError(f'{function} request failed with status {response.status}')
+                        body = await response.read()
+                # Alpha Vantage doesn't always label its JSON as application/json, so decode it ourselves
+                with metrics.timer('json'):
+                    return json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                metrics.count('upstream_error', symbol)
+                raise AlphaVantageError(f'{function} request failed: {e!r}') from e
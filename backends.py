@@ -0,0 +1,201 @@
+"""Shared state backends for running several bot processes on one machine.
+
+By default every process keeps its response cache and rate budget in memory
+(`cache.TTLCache` and `ratelimit.RateLimiter`). With `CACHE_BACKEND=sqlite`
+they are swapped for the classes below, which keep the same interfaces but
+store their state in one SQLite file, so all processes share one cache and
+one Alpha Vantage call budget.
+"""
+import json
+import sqlite3
+import time
+from ratelimit import DAY, RateLimiter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS calls (
+    name TEXT NOT NULL,
+    made_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_made_at ON calls (name, made_at);
+"""
+
+
+def connect(path):
+    # Autocommit, with explicit BEGIN IMMEDIATE wherever we read-modify-write
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SQLiteCache:
+    """`TTLCache` stand-in whose entries live in SQLite and are shared between processes.
+
+    Keys and values must be JSON serialisable (tuples come back as lists, which
+    doesn't matter for lookups since keys are only ever compared as JSON).
+    Past `maxsize` entries, the least recently used ones are evicted. Counters
+    are per process.
+    """
+
+    def __init__(self, path, maxsize=2048):
+        self.path = path
+        self.maxsize = maxsize
+        self._conn = connect(path)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM responses WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+
+    def __contains__(self, key):
+        row = self._conn.execute('SELECT 1 FROM responses WHERE key = ? AND expires_at > ?', (json.dumps(key), time.time())).fetchone()
+        return row is not None
+
+    def get(self, key, default=None):
+        now = time.time()
+        key = json.dumps(key)
+        row = self._conn.execute('SELECT value, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = row
+        if expires_at <= now:
+            self._conn.execute('DELETE FROM responses WHERE key = ? AND expires_at <= ?', (key, now))
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._conn.execute('UPDATE responses SET used_at = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)',
+                (json.dumps(key), json.dumps(value), now + ttl, now),
+            )
+            excess = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0] - self.maxsize
+            if excess > 0:
+                # Make room by dropping expired entries first, then the least recently used
+                self.expirations += self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,)).rowcount
+                excess = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0] - self.maxsize
+            if excess > 0:
+                self._conn.execute('DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at LIMIT ?)', (excess,))
+                self.evictions += excess
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def pop(self, key, default=None):
+        key = json.dumps(key)
+        row = self._conn.execute('SELECT value FROM responses WHERE key = ?', (key,)).fetchone()
+        self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+        return default if row is None else json.loads(row[0])
+
+    def clear(self):
+        self._conn.execute('DELETE FROM responses')
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class SharedRateLimiter(RateLimiter):
+    """`RateLimiter` whose bucket and daily call log live in SQLite.
+
+    Every process sharing the same `path` and `name` draws from one budget.
+    Each process still queues its own callers by priority, and re-reads the
+    shared bucket whenever it decides who goes next. Checking for a token and
+    taking it happen in one transaction, so two processes can't both spend
+    the last one.
+
+    The SQLite calls run on the event loop. Each is a few indexed rows and
+    normally takes well under a millisecond, but while another process holds
+    the write lock one can block the loop for up to the 10 second busy timeout.
+    """
+
+    def __init__(self, path, name='alpha_vantage', **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self._conn = connect(path)
+        self._conn.execute('INSERT OR IGNORE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)', (name, self.capacity, time.time()))
+
+    def throttled(self):
+        self._conn.execute('UPDATE buckets SET tokens = MIN(tokens, 0), updated_at = ? WHERE name = ?', (time.time(), self.name))
+        self._refill()
+
+    def _refill(self):
+        now = time.time()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated_at = self._conn.execute('SELECT tokens, updated_at FROM buckets WHERE name = ?', (self.name,)).fetchone()
+            self.tokens = min(self.capacity, tokens + max(now - updated_at, 0) * self.rate)
+            self._conn.execute('UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?', (self.tokens, now, self.name))
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def _try_take(self):
+        now = time.time()
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            tokens, updated_at = self._conn.execute('SELECT tokens, updated_at FROM buckets WHERE name = ?', (self.name,)).fetchone()
+            self.tokens = min(self.capacity, tokens + max(now - updated_at, 0) * self.rate)
+            taken = self.tokens >= 1 and self._day_remaining() > 0
+            if taken:
+                self.tokens -= 1
+                if self.per_day is not None:
+                    self._conn.execute('INSERT INTO calls (name, made_at) VALUES (?, ?)', (self.name, now))
+            self._conn.execute('UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?', (self.tokens, now, self.name))
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        return taken
+
+    def _refund(self):
+        self._conn.execute('UPDATE buckets SET tokens = MIN(tokens + 1, ?) WHERE name = ?', (self.capacity, self.name))
+        self.tokens += 1
+
+    def _day_remaining(self):
+        if self.per_day is None:
+            return float('inf')
+        cutoff = time.time() - DAY
+        self._conn.execute('DELETE FROM calls WHERE name = ? AND made_at <= ?', (self.name, cutoff))
+        made = self._conn.execute('SELECT COUNT(*) FROM calls WHERE name = ?', (self.name,)).fetchone()[0]
+        return self.per_day - made
+
+    def _day_wait(self):
+        if self._day_remaining() > 0:
+            return 0
+        oldest = self._conn.execute('SELECT MIN(made_at) FROM calls WHERE name = ?', (self.name,)).fetchone()[0]
+        return oldest + DAY - time.time()
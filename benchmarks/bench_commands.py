@@ -0,0 +1,263 @@
+"""Load test the slash commands offline, against a fake Alpha Vantage.
+
+Starts `benchmarks.fake_alpha_vantage` in its own process, imports reobot.py
+pointed at it, and calls each command's coroutine directly with a mock
+interaction context, as `--users` people each running `--requests` commands
+back to back would. Nothing touches Discord or the real API.
+
+For every command it reports p50/p99 latency, requests per second, peak
+resident memory (the bot process plus its renderer workers) and how many
+upstream calls were made, followed by the p50 of each stage from the bot's
+own metrics. Caches and stored bars are emptied before each command, so
+every run starts cold and warms up as users repeat symbols. Responses are
+generated unless `--fixtures` points at recorded ones.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_commands --users 20 --requests 10 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+COMMANDS = ['crypto_price', 'stock_price', 'quotes', 'info', 'day_chart', 'week_chart', 'month_chart', 'year_chart', 'chart']
+
+
+class MockContext:
+    """Stands in for `discord.ApplicationContext`, keeping what the command sends.
+
+    Every message waits `latency` seconds, as a stand-in for the Discord API.
+    """
+
+    def __init__(self, command, options, latency=0.0):
+        self.command = command
+        self.selected_options = [{'name': name, 'value': value} for name, value in options.items()]
+        self.channel = None
+        self.latency = latency
+        self.messages = []
+
+    async def respond(self, content=None, *, embed=None, file=None, ephemeral=False):
+        await self._deliver(content, embed, file)
+
+    async def send(self, content=None, *, embed=None, file=None):
+        await self._deliver(content, embed, file)
+
+    async def defer(self, ephemeral=False):
+        pass
+
+    @property
+    def succeeded(self):
+        # Every command answers with an embed when it works and plain text when it doesn't
+        return any(embed is not None for _, embed, _ in self.messages)
+
+    @property
+    def last_message(self):
+        return self.messages[-1][0] if self.messages else None
+
+    async def _deliver(self, content, embed, file):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages.append((content, embed, file))
+
+
+class MemorySampler:
+    """Polls the resident memory of some processes and keeps the peak of their total."""
+
+    def __init__(self, pids, interval=0.01):
+        self.pids = pids
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def start(self):
+        self.peak = self.total()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self.peak = max(self.peak, self.total())
+        return self.peak
+
+    def total(self):
+        return sum(rss(pid) for pid in self.pids())
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, self.total())
+            await asyncio.sleep(self.interval)
+
+
+def rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # No /proc (e.g. macOS), so fall back to this process's high water mark
+        if pid != os.getpid():
+            return 0
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def command_options(name, rng, symbols, timeframes):
+    if name == 'quotes':
+        return {'symbols': ' '.join(rng.sample(symbols, min(5, len(symbols))))}
+    if name == 'chart':
+        return {'symbol': rng.choice(symbols), 'timeframe': rng.choice(timeframes), 'interval': 'auto'}
+    return {'symbol': rng.choice(symbols)}
+
+
+async def start_fake_server(args):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'benchmarks.fake_alpha_vantage', '--port', '0',
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        *(['--per-minute', str(args.av_per_minute)] if args.av_per_minute else []),
+        *(['--fixtures', args.fixtures] if args.fixtures else []),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = await asyncio.wait_for(process.stdout.readline(), 30)
+    if not line:
+        raise RuntimeError('The fake Alpha Vantage server did not start')
+    return process, line.decode().split()[-1]
+
+
+def reset(reobot, directory, run):
+    """Empty every cache and start a new bar store, so each command starts cold."""
+    from cache import ChartCache
+    from store import OHLCVStore
+
+    reobot.alpha_vantage.cache.clear()
+    reobot.chart_cache = ChartCache()
+    reobot.ohlcv_store.close()
+    reobot.ohlcv_store = OHLCVStore(os.path.join(directory, f'ohlcv-{run}.sqlite3'))
+
+
+async def run_command(reobot, name, args, symbols, timeframes):
+    command = getattr(reobot, name)
+    latencies = []
+    failures = Counter()  # what failed requests answered with
+
+    async def user(seed):
+        rng = random.Random(seed)
+        for _ in range(args.requests):
+            options = command_options(name, rng, symbols, timeframes)
+            ctx = MockContext(command, options, args.discord_latency)
+            start = time.perf_counter()
+            # Go through the same hooks as a real interaction so the bot's stage metrics are recorded
+            await reobot.start_timing(ctx)
+            try:
+                await command.callback(ctx, **options)
+            except Exception as e:
+                ctx.messages.append((f'{type(e).__name__}: {e}', None, None))
+            finally:
+                await reobot.stop_timing(ctx)
+            latencies.append(time.perf_counter() - start)
+            if not ctx.succeeded:
+                failures[ctx.last_message] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(f'{args.seed}-{name}-{i}') for i in range(args.users)))
+    return latencies, failures, time.perf_counter() - start
+
+
+async def main(args):
+    server, url = await start_fake_server(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix='reo-bench-') as directory:
+            await benchmark(args, url, directory)
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+async def benchmark(args, url, directory):
+    # reobot.py reads its configuration on import, and .env never overrides what's already set
+    os.environ.update(
+        ALPHA_VANTAGE_URL=url,
+        ALPHA_VANTAGE_API_KEY='benchmark',
+        ALPHA_VANTAGE_CALLS_PER_MINUTE=str(args.calls_per_minute),
+        ALPHA_VANTAGE_CALLS_PER_DAY='0',
+        CACHE_BACKEND='memory',
+        OHLCV_DB_PATH=os.path.join(directory, 'ohlcv.sqlite3'),
+        CHART_CACHE_DIR='',
+        METRICS_PORT='0',
+        SHARD_COUNT='',
+        SHARD_IDS='',
+    )
+    import reobot
+    from charts import TIMEFRAMES
+    from metrics import metrics
+
+    # Embeds use the bot's avatar, which only exists once logged in
+    reobot.bot._connection.user = SimpleNamespace(display_avatar=SimpleNamespace(url='https://cdn.discordapp.com/embed/avatars/0.png'))
+    await reobot.alpha_vantage.start()
+    await reobot.renderer.start()
+    sampler = MemorySampler(lambda: [os.getpid(), *(reobot.renderer._pool._processes or {})])
+
+    symbols = [f'S{i:03d}' for i in range(args.symbols)]
+    names = args.commands.split(',') if args.commands else COMMANDS
+    print(f'{args.users} users x {args.requests} requests, {args.symbols} symbols, {args.latency * 1000:.0f}ms Alpha Vantage latency')
+    print(f"{'command':<14} {'requests':>8} {'failed':>7} {'p50':>9} {'p99':>9} {'req/s':>8} {'peak rss':>10} {'upstream':>9}")
+    failures = {}
+    try:
+        for run, name in enumerate(names):
+            reset(reobot, directory, run)
+            sampler.start()
+            latencies, failures[name], elapsed = await run_command(reobot, name, args, symbols, list(TIMEFRAMES))
+            peak = await sampler.stop()
+            upstream = metrics.histograms.get((name, 'alpha_vantage'))
+            print(
+                f'{name:<14} {len(latencies):>8} {sum(failures[name].values()):>7} {percentile(latencies, 0.5) * 1000:>7.0f}ms {percentile(latencies, 0.99) * 1000:>7.0f}ms'
+                f' {len(latencies) / elapsed:>8.1f} {peak / 2 ** 20:>8.1f}MB {upstream.count if upstream else 0:>9}'
+            )
+
+        print('\nStage p50 per command:')
+        for name in names:
+            stages = sorted((stage, histogram) for (command, stage), histogram in metrics.histograms.items() if command == name and stage != 'total')
+            print(f'{name:<14} ' + ', '.join(f'{stage} {histogram.quantile(0.5) * 1000:.1f}ms' for stage, histogram in stages))
+
+        if any(failures.values()):
+            print('\nFailed requests:')
+            for name, reasons in failures.items():
+                for reason, count in reasons.most_common():
+                    print(f'{name:<14} {count:>4} x {reason}')
+    finally:
+        await reobot.alpha_vantage.close()
+        await reobot.renderer.close()
+        reobot.ohlcv_store.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10, help='concurrent users per command')
+    parser.add_argument('--requests', type=int, default=5, help='commands each user runs back to back')
+    parser.add_argument('--symbols', type=int, default=20, help='how many distinct symbols users pick from')
+    parser.add_argument('--commands', default=None, help=f'comma separated commands to run (default: {",".join(COMMANDS)})')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the fake Alpha Vantage takes to answer')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds added to that latency')
+    parser.add_argument('--av-per-minute', type=int, default=None, help='make the fake Alpha Vantage throttle past this many calls a minute')
+    parser.add_argument('--fixtures', default=None, help='directory of recorded <FUNCTION>_<SYMBOL>.json responses for the fake Alpha Vantage to serve')
+    parser.add_argument('--calls-per-minute', type=int, default=100_000, help="the bot's own Alpha Vantage call budget")
+    parser.add_argument('--discord-latency', type=float, default=0.0, help='seconds each Discord message takes to send')
+    parser.add_argument('--seed', default='0')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
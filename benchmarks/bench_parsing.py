@@ -0,0 +1,58 @@
+"""Compare the original per-row time series parsing with charts.parse_time_series.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parsing
+"""
+import timeit
+from datetime import datetime, timedelta
+import pandas as pd
+from benchmarks.payloads import daily_payload, intraday_payload
+from charts import parse_time_series
+
+
+def legacy_daily(time_series, days=365):
+    # The parsing app.py's year_chart did before the shared pipeline
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    window = {date: data for date, data in time_series.items() if start_date <= datetime.strptime(date, '%Y-%m-%d') <= end_date}
+    window = dict(sorted(window.items()))
+    df = pd.DataFrame.from_dict(window, orient='index')
+    df.index = pd.to_datetime(df.index)
+    df.columns = ['open', 'high', 'low', 'close', 'volume']
+    return df.astype(float)
+
+
+def vectorized_daily(time_series, days=365):
+    df = parse_time_series(time_series)
+    return df.loc[df.index[-1] - pd.Timedelta(days=days):]
+
+
+def legacy_intraday(time_series):
+    df = pd.DataFrame.from_dict(time_series, orient='index')
+    df.index = pd.to_datetime(df.index)
+    df.columns = ['open', 'high', 'low', 'close', 'volume']
+    return df.astype(float)
+
+
+def best_of(func, *args, number=20, repeat=5):
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=repeat)) / number
+
+
+def main():
+    daily = daily_payload()['Time Series (Daily)']
+    intraday = intraday_payload()['Time Series (5min)']
+    cases = [
+        (f'daily, {len(daily)} bars, 365 day window', legacy_daily, vectorized_daily, daily),
+        (f'intraday, {len(intraday)} bars', legacy_intraday, parse_time_series, intraday),
+    ]
+
+    print(f"{'payload':<36} {'legacy':>10} {'vectorized':>12} {'speedup':>8}")
+    for name, legacy, vectorized, time_series in cases:
+        before = best_of(legacy, time_series)
+        after = best_of(vectorized, time_series)
+        print(f'{name:<36} {before * 1000:>8.2f}ms {after * 1000:>10.2f}ms {before / after:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
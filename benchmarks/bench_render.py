@@ -0,0 +1,44 @@
+"""Compare render time and PNG size of full resolution charts with resampled ones.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_render
+"""
+import timeit
+import pandas as pd
+from benchmarks.payloads import daily_payload
+from charts import TIMEFRAMES, parse_time_series, resample
+import renderer
+
+
+def best_of(func, *args, number=5, repeat=5):
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=repeat)) / number
+
+
+def main():
+    renderer._init_worker()
+    daily = parse_time_series(daily_payload()['Time Series (Daily)'])
+    cases = [
+        ('quarter', 'daily', 'weekly'),
+        ('year', 'daily', 'weekly'),
+        ('year', 'daily', 'monthly'),
+    ]
+
+    print(f"{'chart':<28} {'bars':>10} {'render':>16} {'png size':>18}")
+    for timeframe, before, after in cases:
+        window = daily.loc[daily.index[-1] - pd.Timedelta(days=TIMEFRAMES[timeframe]):]
+        full = resample(window, before)
+        small = resample(window, after)
+        full_time = best_of(renderer._render, full, 'benchmark')
+        small_time = best_of(renderer._render, small, 'benchmark')
+        full_size = len(renderer._render(full, 'benchmark')[0])
+        small_size = len(renderer._render(small, 'benchmark')[0])
+        print(
+            f'{timeframe + ", " + before + " -> " + after:<28} {len(full):>4} -> {len(small):<4}'
+            f' {full_time * 1000:>5.0f} -> {small_time * 1000:<5.0f}ms'
+            f' {full_size / 1024:>5.1f} -> {small_size / 1024:<5.1f}KB'
+        )
+
+
+if __name__ == '__main__':
+    main()
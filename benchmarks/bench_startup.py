@@ -0,0 +1,50 @@
+"""Measure how long importing the bot (reobot.py) takes and how much memory it needs.
+
+Each sample is a fresh interpreter, so nothing is already cached. The
+"eager" case imports pandas, matplotlib.pyplot and mplfinance up front the
+way the bot used to, for comparison. Run from the repository root:
+
+    python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, resource, time
+start = time.perf_counter()
+{imports}
+import reobot
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+CASES = {
+    'lazy (current reobot.py)': '',
+    'eager pandas/matplotlib/mplfinance': 'import pandas, matplotlib.pyplot, mplfinance',
+}
+
+
+def sample(imports, env):
+    output = subprocess.run([sys.executable, '-c', CHILD.format(imports=imports)], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the import from creating files in the working tree
+        env = dict(os.environ, OHLCV_DB_PATH=os.path.join(tmp, 'ohlcv.sqlite3'), MPLBACKEND='Agg', PYTHONPATH=os.getcwd())
+        print(f"{'startup':<38} {'median':>9} {'max rss':>10}")
+        for name, imports in CASES.items():
+            samples = [sample(imports, env) for _ in range(runs)]
+            seconds = statistics.median(s['seconds'] for s in samples)
+            rss = statistics.median(s['max_rss_kb'] for s in samples)
+            print(f'{name:<38} {seconds * 1000:>7.0f}ms {rss / 1024:>8.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
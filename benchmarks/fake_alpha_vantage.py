@@ -0,0 +1,154 @@
+"""A local stand-in for the Alpha Vantage API, for benchmarks and offline testing.
+
+Serves GLOBAL_QUOTE, CURRENCY_EXCHANGE_RATE, TIME_SERIES_INTRADAY,
+TIME_SERIES_DAILY and OVERVIEW responses for any symbol. Payloads come from
+`--fixtures` when a recorded `<FUNCTION>_<SYMBOL>.json` exists there, and are
+otherwise generated by `benchmarks.payloads`. Every response can be delayed by
+`--latency` (plus or minus `--jitter`) seconds, and past `--per-minute` calls
+in a minute it answers with the same Note Alpha Vantage sends when throttling.
+Symbols starting with INVALID get an Error Message.
+
+Run from the repository root and point the bot at it:
+
+    python -m benchmarks.fake_alpha_vantage --port 8765 --latency 0.3 --per-minute 5
+    ALPHA_VANTAGE_URL=http://127.0.0.1:8765/query python app.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from aiohttp import web
+from benchmarks.payloads import daily_payload, exchange_rate_payload, intraday_payload, overview_payload, quote_payload
+
+THROTTLE_NOTE = {
+    'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day.',
+}
+
+# Bars in a compact response, and trading days in a full intraday response (the trailing month)
+COMPACT_BARS = 100
+FULL_INTRADAY_DAYS = 22
+FULL_DAILY_BARS = 6000
+
+
+class FakeAlphaVantage:
+    def __init__(self, latency=0.0, jitter=0.0, per_minute=None, fixtures=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_minute = per_minute
+        self.fixtures = fixtures
+        self.calls = Counter()  # function -> calls answered
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._recent = deque()  # when the calls of the last minute were made
+        self._bodies = {}  # request parameters -> encoded payload, so generating it isn't measured
+        self._runner = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving and return the URL to use as ALPHA_VANTAGE_URL."""
+        app = web.Application()
+        app.router.add_get('/query', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        return f'http://{host}:{port}/query'
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+        self._runner = None
+
+    async def handle(self, request):
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+
+        if self._throttled():
+            self.throttled += 1
+            return web.json_response(THROTTLE_NOTE)
+
+        params = {k: v for k, v in request.query.items() if k != 'apikey'}
+        key = tuple(sorted(params.items()))
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = json.dumps(self.payload(params)).encode()
+        self.calls[params.get('function')] += 1
+        # Alpha Vantage doesn't always label its JSON as application/json
+        return web.Response(body=body, content_type='text/plain')
+
+    def payload(self, params):
+        function = params.get('function')
+        symbol = params.get('symbol', params.get('from_currency', '')).upper()
+        if symbol.startswith('INVALID'):
+            return {'Error Message': f'Invalid API call. Please retry or visit the documentation for {function}.'}
+
+        recorded = self._recorded(function, symbol)
+        if recorded is not None:
+            return recorded
+
+        if function == 'GLOBAL_QUOTE':
+            return quote_payload(symbol)
+        if function == 'CURRENCY_EXCHANGE_RATE':
+            return exchange_rate_payload(symbol, params.get('to_currency', 'USD'))
+        if function == 'OVERVIEW':
+            return overview_payload(symbol)
+        if function == 'TIME_SERIES_DAILY':
+            return daily_payload(symbol, bars=FULL_DAILY_BARS if params.get('outputsize') == 'full' else COMPACT_BARS)
+        if function == 'TIME_SERIES_INTRADAY':
+            minutes = int(params.get('interval', '5min').removesuffix('min'))
+            regular_hours = params.get('extended_hours', 'true') == 'false'
+            per_day = (390 if regular_hours else 960) // minutes
+            bars = FULL_INTRADAY_DAYS * per_day if params.get('outputsize') == 'full' else COMPACT_BARS
+            return intraday_payload(symbol, bars=bars, interval=minutes, regular_hours=regular_hours)
+        return {'Error Message': f'This API function ({function}) does not exist.'}
+
+    def _recorded(self, function, symbol):
+        if not self.fixtures:
+            return None
+        path = os.path.join(self.fixtures, f'{function}_{symbol}.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _throttled(self):
+        if self.per_minute is None:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.per_minute:
+            return True
+        self._recent.append(now)
+        return False
+
+
+async def serve(args):
+    server = FakeAlphaVantage(latency=args.latency, jitter=args.jitter, per_minute=args.per_minute, fixtures=args.fixtures)
+    url = await server.start(args.host, args.port)
+    # bench_commands.py waits for this line before starting
+    print(f'Serving fake Alpha Vantage at {url}', flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before answering')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds added to the latency')
+    parser.add_argument('--per-minute', type=int, default=None, help='answer with a throttle Note past this many calls a minute')
+    parser.add_argument('--fixtures', default=None, help='directory of recorded <FUNCTION>_<SYMBOL>.json responses')
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Synthetic Alpha Vantage payloads shaped like the real API responses."""
+import random
+from datetime import datetime, time, timedelta
+
+
+def _bars(timestamps, seed):
+    rng = random.Random(seed)
+    price = 100.0
+    series = {}
+    for timestamp in timestamps:
+        price = max(1.0, price + rng.gauss(0, 1))
+        high = price + rng.random()
+        low = price - rng.random()
+        series[timestamp] = {
+            '1. open': f'{price:.4f}',
+            '2. high': f'{high:.4f}',
+            '3. low': f'{low:.4f}',
+            '4. close': f'{rng.uniform(low, high):.4f}',
+            '5. volume': str(rng.randint(1_000, 5_000_000)),
+        }
+    return series
+
+
+def daily_payload(symbol='AAPL', bars=6000, end=None, seed=0):
+    """A TIME_SERIES_DAILY response with `bars` weekday bars, newest first (outputsize=full is ~6000)."""
+    day = (end or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = []
+    while len(dates) < bars:
+        if day.weekday() < 5:
+            dates.append(day.strftime('%Y-%m-%d'))
+        day -= timedelta(days=1)
+    return {
+        'Meta Data': {'1. Information': 'Daily Prices (open, high, low, close) and Volumes', '2. Symbol': symbol},
+        'Time Series (Daily)': _bars(dates, seed),
+    }
+
+
+def intraday_payload(symbol='AAPL', bars=4000, interval=5, end=None, seed=0, regular_hours=False):
+    """A TIME_SERIES_INTRADAY response with `bars` bars `interval` minutes apart, newest first.
+
+    With `regular_hours`, only bars inside the 9:30 to 16:00 weekday session are
+    included, like a request made with extended_hours=false.
+    """
+    moment = (end or datetime.now()).replace(second=0, microsecond=0)
+    moment -= timedelta(minutes=moment.minute % interval)
+    timestamps = []
+    while len(timestamps) < bars:
+        if not regular_hours or (moment.weekday() < 5 and time(9, 30) <= moment.time() < time(16, 0)):
+            timestamps.append(moment.strftime('%Y-%m-%d %H:%M:%S'))
+        moment -= timedelta(minutes=interval)
+    return {
+        'Meta Data': {'1. Information': f'Intraday ({interval}min) open, high, low, close prices and volume', '2. Symbol': symbol},
+        f'Time Series ({interval}min)': _bars(timestamps, seed),
+    }
+
+
+def quote_payload(symbol='AAPL', seed=0):
+    """A GLOBAL_QUOTE response."""
+    rng = random.Random(f'{symbol}-{seed}')
+    previous = rng.uniform(10, 500)
+    price = previous * rng.uniform(0.95, 1.05)
+    return {
+        'Global Quote': {
+            '01. symbol': symbol,
+            '02. open': f'{previous * rng.uniform(0.99, 1.01):.4f}',
+            '03. high': f'{max(price, previous) * 1.01:.4f}',
+            '04. low': f'{min(price, previous) * 0.99:.4f}',
+            '05. price': f'{price:.4f}',
+            '06. volume': str(rng.randint(100_000, 50_000_000)),
+            '07. latest trading day': datetime.now().strftime('%Y-%m-%d'),
+            '08. previous close': f'{previous:.4f}',
+            '09. change': f'{price - previous:.4f}',
+            '10. change percent': f'{(price - previous) / previous * 100:.4f}%',
+        }
+    }
+
+
+def exchange_rate_payload(from_currency='BTC', to_currency='USD', seed=0):
+    """A CURRENCY_EXCHANGE_RATE response."""
+    rng = random.Random(f'{from_currency}-{seed}')
+    rate = rng.uniform(0.1, 70_000)
+    return {
+        'Realtime Currency Exchange Rate': {
+            '1. From_Currency Code': from_currency,
+            '2. From_Currency Name': from_currency,
+            '3. To_Currency Code': to_currency,
+            '4. To_Currency Name': to_currency,
+            '5. Exchange Rate': f'{rate:.8f}',
+            '6. Last Refreshed': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            '7. Time Zone': 'UTC',
+            '8. Bid Price': f'{rate * 0.9999:.8f}',
+            '9. Ask Price': f'{rate * 1.0001:.8f}',
+        }
+    }
+
+
+def overview_payload(symbol='AAPL', seed=0):
+    """An OVERVIEW response, trimmed to the fields /info shows plus a few others."""
+    rng = random.Random(f'{symbol}-{seed}')
+    return {
+        'Symbol': symbol,
+        'AssetType': 'Common Stock',
+        'Name': f'{symbol} Inc',
+        'Description': f'{symbol} Inc is a company used for benchmarking. ' * 20,
+        'Exchange': 'NASDAQ',
+        'Currency': 'USD',
+        'Country': 'USA',
+        'Sector': 'TECHNOLOGY',
+        'Industry': 'SERVICES-PREPACKAGED SOFTWARE',
+        'OfficialSite': f'https://www.example.com/{symbol.lower()}',
+        'MarketCapitalization': str(rng.randint(1_000_000_000, 3_000_000_000_000)),
+        'PERatio': f'{rng.uniform(5, 80):.2f}',
+        'EPS': f'{rng.uniform(-2, 20):.2f}',
+        'DividendPerShare': f'{rng.uniform(0, 5):.2f}',
+        'DividendYield': f'{rng.uniform(0, 0.06):.4f}',
+        '52WeekHigh': f'{rng.uniform(200, 300):.2f}',
+        '52WeekLow': f'{rng.uniform(100, 200):.2f}',
+    }
@@ -0,0 +1,226 @@
+import asyncio
+import glob
+import os
+import re
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries each expire after their own TTL.
+
+    Holds at most `maxsize` entries; once full, the least recently used entry
+    is evicted. Hit, miss, eviction and expiry counts are kept for `stats()`.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key starts `func()`; everyone else asking for that
+    key while it runs awaits the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, func):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # Shield so one waiter being cancelled doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+
+class ChartCache:
+    """Rendered chart PNGs keyed by symbol, timeframe and newest bar timestamp.
+
+    Only the latest render per (symbol, timeframe) is kept, so a chart built
+    after a newer bar arrives replaces the stale one. Up to `maxsize` charts
+    are held in memory; if `directory` is set, PNGs are also written there
+    (one file per symbol and timeframe) so they survive restarts. Past
+    `max_files` files, the least recently written or read ones are deleted.
+    """
+
+    def __init__(self, maxsize=128, directory=None, max_files=512):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_files = max_files
+        self._data = OrderedDict()  # (symbol, timeframe) -> (last_bar, png)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, symbol, timeframe, last_bar):
+        key = (symbol, timeframe)
+        last_bar = str(last_bar)
+        entry = self._data.get(key)
+        if entry is not None and entry[0] == last_bar:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        png = self._read(symbol, timeframe, last_bar)
+        if png is not None:
+            self._remember(key, last_bar, png)
+            self.hits += 1
+            return png
+
+        self.misses += 1
+        return None
+
+    def set(self, symbol, timeframe, last_bar, png):
+        last_bar = str(last_bar)
+        self._remember((symbol, timeframe), last_bar, png)
+        self._write(symbol, timeframe, last_bar, png)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _remember(self, key, last_bar, png):
+        self._data[key] = (last_bar, png)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, symbol, timeframe, last_bar=None):
+        name = _safe_filename(f'{symbol}_{timeframe}_')
+        name += '*' if last_bar is None else _safe_filename(last_bar)
+        return os.path.join(self.directory, f'{name}.png')
+
+    def _read(self, symbol, timeframe, last_bar):
+        if not self.directory:
+            return None
+        path = self._path(symbol, timeframe, last_bar)
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+            # Mark it as recently used, so the directory is trimmed least recently used first
+            os.utime(path)
+        except OSError:
+            return None
+        return png
+
+    def _write(self, symbol, timeframe, last_bar, png):
+        if not self.directory:
+            return
+        path = self._path(symbol, timeframe, last_bar)
+        # Drop renders built from older bars before writing the new one
+        for stale in glob.glob(self._path(symbol, timeframe)):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    # Another bot process sharing the directory got there first
+                    pass
+        # Write then rename, so other processes never read a half written PNG
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(png)
+        os.replace(tmp, path)
+        self._trim()
+
+    def _trim(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.png'):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        if len(files) <= self.max_files:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another bot process sharing the directory got there first
+                pass
+
+
+def _safe_filename(text):
+    return re.sub(r'[^A-Za-z0-9.-]', '_', text)
@@ -0,0 +1,272 @@
+import math
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+from alpha_vantage import AlphaVantageError
+from metrics import metrics
+from store import COLUMNS
+
+# Stored daily bars are re-synced with Alpha Vantage at most this often (seconds)
+DAILY_SYNC_INTERVAL = 60 * 60
+
+# outputsize=compact returns the latest 100 trading days, which always covers this many calendar days
+COMPACT_DAYS = 100
+
+INVALID_INPUTS = 'Invalid inputs in chart command. Please enter a valid symbol or function.'
+NO_DATA = 'No data available for the given symbol.'
+
+# Timeframes a chart can cover, in calendar days
+TIMEFRAMES = {
+    'day': 1,
+    'week': 7,
+    'month': 30,
+    'quarter': 91,
+    'year': 365,
+}
+
+# Candle sizes, finest first, with how many of them fit in one regular trading session
+INTERVALS = {
+    '1min': 390,
+    '5min': 78,
+    '15min': 26,
+    '30min': 13,
+    '60min': 7,
+    'daily': 1,
+    'weekly': 1 / 5,
+    'monthly': 1 / 21,
+}
+INTRADAY_INTERVALS = ('1min', '5min', '15min', '30min', '60min')
+AUTO = 'auto'
+
+# Daily bars are resampled into longer candles, each labelled with the day its period starts
+RESAMPLE_RULES = {'weekly': 'W-MON', 'monthly': 'MS'}
+OHLCV_AGGREGATES = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+# AUTO picks the finest interval that draws at most TARGET_BARS candles (5min for a day,
+# 30min for a week, weekly for a year). Explicit intervals are refused past MAX_BARS.
+TARGET_BARS = 120
+MAX_BARS = 500
+
+# outputsize=compact returns the latest 100 intraday bars, full the trailing month
+COMPACT_BARS = 100
+INTRADAY_DAYS = 30
+
+
+class ChartError(Exception):
+    """Raised with a user-facing message when a chart can't be built."""
+
+
+async def build_chart(client, store, renderer, symbol, timeframe, interval=AUTO, cache=None):
+    """Build a candlestick chart of `symbol` over `timeframe`, one candle per `interval`.
+
+    Intraday intervals are fetched from Alpha Vantage at that interval and cut
+    down to the last `timeframe` worth of sessions. Daily, weekly and monthly
+    candles are read from the local `OHLCVStore` (synced first) and resampled,
+    so they never cost an upstream call of their own. With `AUTO`, the finest
+    interval that fits in `TARGET_BARS` candles is used. If a `ChartCache` is
+    given, a chart already rendered up to the same bar is returned from it.
+    """
+    interval = resolve_interval(timeframe, interval)
+    if interval in INTRADAY_INTERVALS:
+        return await _intraday_chart(client, renderer, symbol, timeframe, interval, cache)
+    return await _daily_chart(client, store, renderer, symbol, timeframe, interval, cache)
+
+
+def resolve_interval(timeframe, interval=AUTO):
+    """Pick the interval for `AUTO`, or check that `interval` can be drawn over `timeframe`."""
+    if timeframe not in TIMEFRAMES:
+        raise ChartError(f'Unknown timeframe {timeframe}. Choose one of {", ".join(TIMEFRAMES)}.')
+    if interval == AUTO:
+        return next((i for i in INTERVALS if available(timeframe, i) and estimated_bars(timeframe, i) <= TARGET_BARS), 'monthly')
+    if interval not in INTERVALS:
+        raise ChartError(f'Unknown interval {interval}. Choose one of {", ".join(INTERVALS)}.')
+    if not available(timeframe, interval):
+        raise ChartError(f'Intraday intervals only go back {INTRADAY_DAYS} days. Please pick a daily or longer interval.')
+    if estimated_bars(timeframe, interval) > MAX_BARS:
+        raise ChartError(f'That would be about {estimated_bars(timeframe, interval)} candles. Please pick a longer interval.')
+    return interval
+
+
+def available(timeframe, interval):
+    return interval not in INTRADAY_INTERVALS or TIMEFRAMES[timeframe] <= INTRADAY_DAYS
+
+
+def trading_days(timeframe):
+    return max(1, round(TIMEFRAMES[timeframe] * 5 / 7))
+
+
+def estimated_bars(timeframe, interval):
+    return math.ceil(trading_days(timeframe) * INTERVALS[interval])
+
+
+def intraday_params(timeframe, interval):
+    """Alpha Vantage parameters for the intraday series behind a chart.
+
+    Only the regular session is fetched, so a day of 5 minute bars fits in one
+    compact response; longer windows need the full month.
+    """
+    outputsize = 'compact' if estimated_bars(timeframe, interval) <= COMPACT_BARS else 'full'
+    return {'interval': interval, 'outputsize': outputsize, 'extended_hours': 'false'}
+
+
+def estimated_chart_wait(client, store, symbol, timeframe, interval):
+    """Seconds a chart would wait on the rate limit, or 0 if its data is cached or stored."""
+    if interval in INTRADAY_INTERVALS:
+        return client.estimated_wait('TIME_SERIES_INTRADAY', symbol=symbol, **intraday_params(timeframe, interval))
+    return estimated_daily_wait(client, store, symbol)
+
+
+async def _intraday_chart(client, renderer, symbol, timeframe, interval, cache):
+    params = intraday_params(timeframe, interval)
+    # A full month of intraday bars runs to megabytes once decoded, too big for the response cache
+    data = await client.query('TIME_SERIES_INTRADAY', cache=params['outputsize'] == 'compact', symbol=symbol, **params)
+    if 'Error Message' in data:
+        raise ChartError(INVALID_INPUTS)
+
+    time_series = data.get(f'Time Series ({interval})', {})
+    if not time_series:
+        raise ChartError(NO_DATA)
+
+    sessions = trading_days(timeframe)
+    latest = max(time_series)
+    return await cached_render(renderer, cache, symbol, f'{timeframe}-{interval}', bar_version(latest, time_series[latest].values()), lambda: last_sessions(parse_time_series(time_series), sessions), f'{symbol} Stock Price ({interval})')
+
+
+async def _daily_chart(client, store, renderer, symbol, timeframe, interval, cache):
+    await sync_daily(client, store, symbol)
+
+    # Slice the past `days` days out of the stored history
+    days = TIMEFRAMES[timeframe]
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    # Start on a period boundary so the first resampled candle isn't a partial one
+    if interval == 'weekly':
+        start_date -= timedelta(days=start_date.weekday())
+    elif interval == 'monthly':
+        start_date = start_date.replace(day=1)
+    rows = store.range(symbol, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+
+    if not rows:
+        raise ChartError(f'No data available for the past {days} days.')
+
+    return await cached_render(renderer, cache, symbol, f'{timeframe}-{interval}', bar_version(rows[-1][0], rows[-1][1:]), lambda: resample(rows_to_frame(rows), interval), f'{symbol} Stock Price ({interval})')
+
+
+async def sync_daily(client, store, symbol, priority=None):
+    """Bring the stored daily bars for `symbol` up to date with Alpha Vantage.
+
+    The first sync seeds the full history (or the compact series, if the key's
+    plan doesn't include it); later syncs fetch the compact series and only
+    write bars from the newest stored date onwards. If a later sync fails, the
+    stored bars are served as they are.
+    """
+    if not sync_due(store, symbol):
+        return
+
+    latest = store.latest_date(symbol)
+    # A gap longer than the compact window can only be filled from the full history
+    full = client.full_history and (latest is None or datetime.now() - datetime.strptime(latest, '%Y-%m-%d') > timedelta(days=COMPACT_DAYS))
+
+    try:
+        # The store keeps the bars, so there's no need to hold the raw payload in the response cache too
+        data = await client.query('TIME_SERIES_DAILY', cache=False, priority=priority, symbol=symbol, outputsize='full' if full else 'compact')
+        if full and 'Information' in data:
+            # Not a throttle (those raise), so outputsize=full is a premium feature for this key
+            client.full_history = False
+            data = await client.query('TIME_SERIES_DAILY', cache=False, priority=priority, symbol=symbol, outputsize='compact')
+    except AlphaVantageError:
+        if latest is None:
+            raise
+        return
+
+    if 'Error Message' in data:
+        raise ChartError(INVALID_INPUTS)
+
+    time_series = data.get('Time Series (Daily)', {})
+    if not time_series:
+        if latest is None:
+            raise ChartError(NO_DATA)
+        return
+
+    with metrics.timer('dataframe'):
+        df = parse_time_series(time_series)
+    # The newest stored bar is rewritten too, since it may have been taken mid-session
+    if latest is not None:
+        df = df.loc[latest:]
+    store.upsert(symbol, zip(df.index.strftime('%Y-%m-%d'), *(df[column].tolist() for column in COLUMNS)))
+
+
+def sync_due(store, symbol):
+    checked_at = store.checked_at(symbol)
+    return checked_at is None or time.time() - checked_at >= DAILY_SYNC_INTERVAL
+
+
+def estimated_daily_wait(client, store, symbol):
+    """Seconds a daily chart would wait on the rate limit, or 0 if the stored bars are fresh."""
+    return client.estimated_wait('TIME_SERIES_DAILY') if sync_due(store, symbol) else 0
+
+
+def parse_time_series(time_series):
+    """Turn an Alpha Vantage time series into a float64 OHLCV DataFrame, oldest bar first.
+
+    Timestamps are parsed as one datetime64 array and every price and volume
+    string is converted in a single numpy call, rather than row by row.
+    """
+    # numpy and pandas are imported on first use to keep them out of bot startup
+    import numpy as np
+    import pandas as pd
+
+    index = pd.DatetimeIndex(np.array(list(time_series), dtype='datetime64[ns]'))
+    values = np.array(list(chain.from_iterable(bar.values() for bar in time_series.values())), dtype=np.float64)
+    df = pd.DataFrame(values.reshape(len(time_series), len(COLUMNS)), index=index, columns=COLUMNS)
+    # Alpha Vantage lists the newest bar first, so this is usually just a reversed view
+    return df.iloc[::-1] if df.index.is_monotonic_decreasing else df.sort_index()
+
+
+def last_sessions(df, sessions):
+    """Keep the bars of the last `sessions` trading days in an intraday DataFrame."""
+    dates = df.index.normalize()
+    return df[dates >= dates.unique()[-sessions:][0]]
+
+
+def resample(df, interval):
+    """Aggregate daily OHLCV bars into `interval` candles ('daily' leaves them as they are)."""
+    if interval not in RESAMPLE_RULES:
+        return df
+    bars = df.resample(RESAMPLE_RULES[interval], closed='left', label='left').agg(OHLCV_AGGREGATES)
+    # Periods without a single trading day (long market closures) come out empty
+    return bars.dropna(subset=['open'])
+
+
+def rows_to_frame(rows):
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(rows, columns=['date', *COLUMNS], index='date')
+    df.index = pd.to_datetime(df.index, format='%Y-%m-%d')
+    return df
+
+
+def bar_version(timestamp, values):
+    """Identifies the newest bar a chart was drawn from.
+
+    The newest bar can still change during the session (sync_daily rewrites it),
+    so its values are part of the version, not just its timestamp.
+    """
+    return '_'.join(str(value) for value in (timestamp, *values))
+
+
+async def cached_render(renderer, cache, symbol, timeframe, last_bar, make_frame, title):
+    """Render the chart built by `make_frame()` under `title`, unless `cache` already has it up to `last_bar`."""
+    if cache is not None:
+        png = cache.get(symbol, timeframe, last_bar)
+        if png is not None:
+            metrics.count('chart_cache_hit', symbol)
+            return png
+        metrics.count('chart_cache_miss', symbol)
+
+    with metrics.timer('dataframe'):
+        df = make_frame()
+    png = await renderer.render(df, title)
+    if cache is not None:
+        cache.set(symbol, timeframe, last_bar, png)
+    return png
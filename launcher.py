@@ -0,0 +1,63 @@
+"""Run reo-bot as several processes, each connected to its own slice of Discord shards.
+
+    python launcher.py --processes 2 --shards 4
+
+Every process runs app.py with SHARD_COUNT and its own SHARD_IDS. Unless
+CACHE_BACKEND is set already, they use the sqlite backend, so the processes
+share one response cache, one chart cache and one Alpha Vantage call budget
+instead of each spending their own. BOT_PROCESSES tells each of them how many
+share that budget, so their background work only takes its part of it.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def shard_slices(shards, processes):
+    """Split shard ids 0..shards-1 across processes round robin."""
+    return [list(range(shards))[i::processes] for i in range(processes)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='bot processes to start (default: one per CPU)')
+    parser.add_argument('--shards', type=int, help='total Discord shards (default: one per process)')
+    args = parser.parse_args()
+
+    shards = args.shards or args.processes
+    if shards < args.processes:
+        parser.error('--shards must be at least --processes, every process needs a shard')
+
+    children = []
+    for shard_ids in shard_slices(shards, args.processes):
+        env = dict(os.environ, SHARD_COUNT=str(shards), SHARD_IDS=','.join(map(str, shard_ids)), BOT_PROCESSES=str(args.processes))
+        env.setdefault('CACHE_BACKEND', 'sqlite')
+        children.append(subprocess.Popen([sys.executable, APP], env=env))
+        print(f'Started shards {shard_ids} in process {children[-1].pid}')
+
+    def stop(*_):
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # If any process dies, take the rest down too so the supervisor can restart the whole set
+    exit_code = 0
+    while any(child.poll() is None for child in children):
+        for child in children:
+            if child.returncode not in (None, 0):
+                exit_code = exit_code or child.returncode
+                stop()
+        time.sleep(1)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Per-command latency histograms and event counters.
+
+`start_command` is called before every slash command runs, and the client,
+chart pipeline and renderer time their stages against the command stored in
+`current`, so every observation is attributed to the command that caused it.
+Everything is exposed in the Prometheus text format by `render()`, and
+`serve()` can publish that over HTTP for a scraper.
+"""
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+log = logging.getLogger(__name__)
+
+# (command, symbol, start time) of the slash command being handled in this task.
+# Tasks started by a command, such as a shared fetch, inherit it.
+current = ContextVar('current', default=('none', '', None))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate the `q` quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.histograms = {}  # (command, stage) -> Histogram
+        self.events = Counter()  # (command, symbol, event) -> count
+
+    def start_command(self, command, symbol=''):
+        current.set((command, symbol, time.perf_counter()))
+
+    def finish_command(self):
+        command, _, started = current.get()
+        if started is not None:
+            self.observe('total', time.perf_counter() - started, command)
+
+    def observe(self, stage, seconds, command=None):
+        key = (command or current.get()[0], stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, event, symbol=None):
+        command, current_symbol, _ = current.get()
+        self.events[(command, symbol or current_symbol, event)] += 1
+
+    def event_totals(self, event):
+        """Counts of `event` per command."""
+        totals = Counter()
+        for (command, _, name), count in self.events.items():
+            if name == event:
+                totals[command] += count
+        return totals
+
+    def render(self):
+        lines = [
+            '# HELP reo_stage_seconds Time spent in each stage of a slash command.',
+            '# TYPE reo_stage_seconds histogram',
+        ]
+        for (command, stage), histogram in sorted(self.histograms.items()):
+            labels = f'command="{_escape(command)}",stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f'reo_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'reo_stage_seconds_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'reo_stage_seconds_count{{{labels}}} {histogram.count}')
+
+        lines += [
+            '# HELP reo_events_total Cache hits, throttles and errors per command and symbol.',
+            '# TYPE reo_events_total counter',
+        ]
+        for (command, symbol, event), count in sorted(self.events.items()):
+            lines.append(f'reo_events_total{{command="{_escape(command)}",symbol="{_escape(symbol)}",event="{_escape(event)}"}} {count}')
+
+        lines += [
+            '# HELP reo_uptime_seconds Seconds since the bot process started.',
+            '# TYPE reo_uptime_seconds gauge',
+            f'reo_uptime_seconds {time.time() - self.started_at}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+async def serve(port, host='0.0.0.0'):
+    """Serve `metrics.render()` at http://host:port/metrics and return the runner to clean up."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.render(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info('Serving metrics on %s:%s', host, port)
+    return runner
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Shared by the whole process
+metrics = Metrics()
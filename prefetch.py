@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime, time as clock, timedelta
+from zoneinfo import ZoneInfo
+from alpha_vantage import CACHE_TTLS, AlphaVantageError
+from charts import ChartError, intraday_params, sync_daily, sync_due
+from metrics import metrics
+from ratelimit import BACKGROUND_PRIORITY, DAY
+
+log = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = clock(9, 30)
+MARKET_CLOSE = clock(16, 0)
+
+# Intraday charts use 5 minute bars; give Alpha Vantage a little time to publish each one
+INTRADAY_MINUTES = 5
+PUBLISH_DELAY = timedelta(seconds=20)
+
+# Daily bars are only final once the session is over, give Alpha Vantage time to publish them
+DAILY_PUBLISH_DELAY = timedelta(minutes=30)
+
+# The intraday series behind the default day chart, which is the one kept warm
+INTRADAY_PARAMS = intraday_params('day', f'{INTRADAY_MINUTES}min')
+
+# Symbols Alpha Vantage has no data for are left alone for this long (seconds)
+FAILED_BACKOFF = DAY
+
+# Kinds of data the prefetcher knows how to warm
+QUOTE = 'quote'
+INTRADAY = 'intraday'
+DAILY = 'daily'
+
+
+def market_open(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def latest_bar_boundary(now=None):
+    """When the newest 5 minute bar should be available from Alpha Vantage."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ) - PUBLISH_DELAY
+    return now.replace(minute=now.minute - now.minute % INTRADAY_MINUTES, second=0, microsecond=0) + PUBLISH_DELAY
+
+
+def latest_session_close(now=None):
+    """When the daily bar of the most recent finished session should be available from Alpha Vantage."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    close = datetime.combine(now.date(), MARKET_CLOSE, MARKET_TZ) + DAILY_PUBLISH_DELAY
+    while close > now or close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+class Prefetcher:
+    """Keeps the most requested symbols warm ahead of demand.
+
+    Commands `record()` each lookup. A background task then wakes every
+    `interval` seconds and refreshes the `top` hottest symbols of each kind:
+    quotes asked for within their cache TTL and intraday series while the
+    market is open (intraday once per new bar), daily series once after each
+    session closes. Symbols that turn out not to exist are left alone for
+    `FAILED_BACKOFF` seconds.
+
+    It only spends calls the rate limiter has spare, keeping `reserve` of them
+    for people, never more than `share` of the per-minute and per-day budgets
+    (split evenly between the `processes` bot processes drawing from them), and
+    queues behind every user request. Without a daily budget on the limiter,
+    `per_day` calls a day are assumed.
+
+    Popularity decays with a `half_life` (seconds), and a symbol needs a score
+    of at least `min_score` to be worth prefetching.
+    """
+
+    def __init__(self, client, store, top=5, interval=15, reserve=2, share=0.2, processes=1, per_day=500, half_life=60 * 60, min_score=1.5):
+        self.client = client
+        self.store = store
+        self.top = top
+        self.interval = interval
+        self.reserve = reserve
+        self.share = share / processes
+        self.per_day = per_day
+        self.half_life = half_life
+        self.min_score = min_score
+        self.refreshes = 0
+        self._scores = {}  # (kind, symbol) -> (score, updated_at)
+        self._intraday_refreshed = {}  # symbol -> bar boundary of the last refresh
+        self._failed = {}  # (kind, symbol) -> when it was found not to exist
+        self._spent = deque()  # monotonic times of the calls made in the last 24 hours
+        self._task = None
+
+    def record(self, kind, symbol):
+        now = time.monotonic()
+        if (kind, symbol) in self._failed:
+            return
+        score, updated_at = self._scores.get((kind, symbol), (0, now))
+        self._scores[(kind, symbol)] = (self._decay(score, now - updated_at) + 1, now)
+
+    def hottest(self, kind, n=None):
+        now = time.monotonic()
+        scores = [
+            (self._decay(score, now - updated_at), symbol)
+            for (k, symbol), (score, updated_at) in self._scores.items()
+            if k == kind
+        ]
+        scores.sort(reverse=True)
+        return [symbol for score, symbol in scores[:n or self.top] if score >= self.min_score]
+
+    def start(self):
+        # on_ready can fire again after a reconnect, so only start one loop
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def refresh(self):
+        """Refresh whatever is due, quotes first and hottest symbols first, as far as the spare call budget goes."""
+        budget = self.budget()
+        for kind, symbol, fetch in self._due():
+            if budget <= 0:
+                break
+            budget -= 1
+            self._spent.append(time.monotonic())
+            try:
+                await fetch()
+                self.refreshes += 1
+            except ChartError as e:
+                # Invalid symbol or no data, which won't change by asking again every round
+                log.warning('Not prefetching %s for %s again: %s', kind, symbol, e)
+                self._failed[(kind, symbol)] = time.monotonic()
+                self._scores.pop((kind, symbol), None)
+            except AlphaVantageError as e:
+                log.warning('Prefetching %s for %s failed: %s', kind, symbol, e)
+
+    def budget(self):
+        """How many calls the next round may make."""
+        limiter = self.client.limiter
+        now = time.monotonic()
+        while self._spent and self._spent[0] <= now - DAY:
+            self._spent.popleft()
+        budget = min(
+            limiter.spare() - self.reserve,
+            math.floor(limiter.rate * 60 * self.share) - sum(1 for spent in self._spent if spent > now - 60),
+        )
+        per_day = limiter.per_day if limiter.per_day is not None else self.per_day
+        return min(budget, math.floor(per_day * self.share) - len(self._spent))
+
+    def _due(self):
+        is_open = market_open()
+        boundary = latest_bar_boundary()
+        for symbol in self.hottest(QUOTE) if is_open else []:
+            # Only quotes someone is still checking on are worth refetching as they expire
+            if self._last_asked(QUOTE, symbol) > CACHE_TTLS['GLOBAL_QUOTE']:
+                continue
+            if self.client.cache_key('GLOBAL_QUOTE', {'symbol': symbol}) not in self.client.cache:
+                yield QUOTE, symbol, lambda symbol=symbol: self.client.query('GLOBAL_QUOTE', refresh=True, priority=BACKGROUND_PRIORITY, symbol=symbol)
+        for symbol in self.hottest(INTRADAY) if is_open else []:
+            if self._intraday_refreshed.get(symbol) != boundary:
+                yield INTRADAY, symbol, lambda symbol=symbol: self._refresh_intraday(symbol, boundary)
+        # A session's daily bar only changes while it trades, so one sync after it closes is enough
+        closed_at = latest_session_close().timestamp()
+        for symbol in self.hottest(DAILY):
+            checked_at = self.store.checked_at(symbol)
+            if sync_due(self.store, symbol) and (checked_at is None or checked_at < closed_at):
+                yield DAILY, symbol, lambda symbol=symbol: sync_daily(self.client, self.store, symbol, priority=BACKGROUND_PRIORITY)
+
+    async def _refresh_intraday(self, symbol, boundary):
+        await self.client.query('TIME_SERIES_INTRADAY', refresh=True, priority=BACKGROUND_PRIORITY, symbol=symbol, **INTRADAY_PARAMS)
+        self._intraday_refreshed[symbol] = boundary
+
+    async def _run(self):
+        # Upstream calls made from here show up under their own name in the metrics
+        metrics.start_command('prefetch')
+        while True:
+            try:
+                self._forget_cold()
+                await self.refresh()
+            except Exception:
+                log.exception('Prefetch round failed')
+            await asyncio.sleep(self.interval)
+
+    def _last_asked(self, kind, symbol):
+        """Seconds since `symbol` was last recorded for `kind`."""
+        return time.monotonic() - self._scores.get((kind, symbol), (0, float('-inf')))[1]
+
+    def _forget_cold(self):
+        now = time.monotonic()
+        for key, failed_at in list(self._failed.items()):
+            if now - failed_at >= FAILED_BACKOFF:
+                del self._failed[key]
+        for key, (score, updated_at) in list(self._scores.items()):
+            if self._decay(score, now - updated_at) < 0.01:
+                del self._scores[key]
+                if key[0] == INTRADAY:
+                    self._intraday_refreshed.pop(key[1], None)
+
+    def _decay(self, score, elapsed):
+        return score * 0.5 ** (elapsed / self.half_life)
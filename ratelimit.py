@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+# Lower numbers are served first
+QUOTE_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+BACKGROUND_PRIORITY = 2
+
+DAY = 24 * 60 * 60
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than the limiter allows."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'rate limit exceeded, retry in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket with a priority queue, shared by every Alpha Vantage call.
+
+    Calls are spread out to `per_minute` a minute (bursting up to `burst`) and
+    at most `per_day` in any 24 hours. Callers that can't go straight away
+    queue up, lowest priority number first, then first come first served. A
+    call that would wait longer than `max_wait` seconds raises
+    `RateLimitExceeded` instead of queueing.
+    """
+
+    def __init__(self, per_minute=5, per_day=None, burst=None, max_wait=120):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.per_day = per_day
+        self.max_wait = max_wait
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._day_calls = deque()  # monotonic times of the calls made in the last 24 hours
+        self._waiters = []  # heap of (priority, seq, future)
+        self._keyed = {}  # key -> future of a queued call that can be promoted
+        self._seq = itertools.count()
+        self._wakeup = None
+
+    @property
+    def queued(self):
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def spare(self):
+        """Calls that could be made right now without making anyone queue."""
+        self._refill()
+        if self.queued:
+            return 0
+        return max(int(min(self.tokens, self._day_remaining())), 0)
+
+    def estimated_wait(self, priority=DEFAULT_PRIORITY, calls=1):
+        """Seconds the last of `calls` calls made now at `priority` would wait for its turn."""
+        self._refill()
+        ahead = sum(1 for p, _, future in self._waiters if p <= priority and not future.done())
+        needed = ahead + calls - self.tokens
+        return max(needed / self.rate if needed > 0 else 0, self._day_wait())
+
+    async def acquire(self, priority=DEFAULT_PRIORITY, key=None):
+        """Wait for a turn at `priority`. A call queued with `key` can later be moved up with `promote`."""
+        wait = self.estimated_wait(priority)
+        if wait > self.max_wait:
+            raise RateLimitExceeded(wait)
+        # Another process sharing the budget may take the token first, in which case we queue
+        if wait <= 0 and self._try_take():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if key is not None:
+            self._keyed[key] = future
+        if self._wakeup is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Hand the token back if we were cancelled right after being let through
+            if future.done() and not future.cancelled():
+                self._refund()
+            raise
+        finally:
+            if key is not None and self._keyed.get(key) is future:
+                del self._keyed[key]
+
+    def promote(self, key, priority):
+        """Move the call queued with `key` up to `priority`, if that's more urgent than where it is."""
+        future = self._keyed.get(key)
+        for i, (p, seq, f) in enumerate(self._waiters):
+            if f is future and priority < p:
+                self._waiters[i] = (priority, seq, f)
+                heapq.heapify(self._waiters)
+                return
+
+    def throttled(self):
+        """Alpha Vantage said we're over the limit, so empty the bucket and let it refill."""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # The bucket state lives in the hooks below, so SharedRateLimiter can keep it somewhere other processes see
+
+    def _day_remaining(self):
+        if self.per_day is None:
+            return float('inf')
+        now = time.monotonic()
+        while self._day_calls and self._day_calls[0] <= now - DAY:
+            self._day_calls.popleft()
+        return self.per_day - len(self._day_calls)
+
+    def _day_wait(self):
+        if self._day_remaining() > 0:
+            return 0
+        return self._day_calls[0] + DAY - time.monotonic()
+
+    def _try_take(self):
+        """Take a token if one, and a call from the daily budget, is free right now."""
+        self._refill()
+        if self.tokens < 1 or self._day_remaining() <= 0:
+            return False
+        self.tokens -= 1
+        if self.per_day is not None:
+            self._day_calls.append(time.monotonic())
+        return True
+
+    def _refund(self):
+        self.tokens += 1
+
+    def _dispatch(self):
+        self._wakeup = None
+        self._refill()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+
+            if not self._try_take():
+                wait = max((1 - self.tokens) / self.rate, self._day_wait())
+                self._wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            future.set_result(None)
@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from metrics import metrics
+
+# matplotlib and mplfinance are only ever imported inside the worker processes,
+# so the bot itself never pays for them. _init_worker sets each one up once.
+_style = None
+
+
+class RenderError(Exception):
+    """Raised with a user-facing message when a chart can't be rendered."""
+
+
+class RendererBusy(RenderError):
+    pass
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+def _init_worker():
+    global _style
+    # Workers never open a window, so pick the non-interactive backend before anything imports pyplot
+    import matplotlib
+    matplotlib.use('Agg')
+    import mplfinance as mpf
+    _style = mpf.make_mpf_style(base_mpf_style='charles')
+
+
+def _warm_up():
+    return True
+
+
+def _render(df, title):
+    import mplfinance as mpf
+    start = time.perf_counter()
+    buf = BytesIO()
+    mpf.plot(df, type='candle', style=_style, title=title, ylabel='Price ($)', savefig=dict(fname=buf, format='png'))
+    # Report how long the plot itself took, so queueing in the pool can be told apart from drawing
+    return buf.getvalue(), time.perf_counter() - start
+
+
+class ChartRenderer:
+    """Renders candlestick charts to PNG bytes in a warm pool of worker processes.
+
+    At most `max_pending` jobs may be queued or running at once; past that,
+    `render` raises `RendererBusy` instead of piling more work on the pool.
+    Jobs taking longer than `timeout` seconds raise `RenderTimeout`, and the
+    pool is replaced so the hung worker doesn't keep its slot. A pool broken by
+    a worker dying is replaced too, and its jobs raise `RenderError`.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, timeout=20):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._pool = None
+
+    @property
+    def started(self):
+        return self._pool is not None
+
+    async def start(self):
+        if self.started:
+            return
+        # spawn rather than fork so workers don't inherit the bot's event loop and sockets
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker)
+        # Start every worker up front so the first chart doesn't pay for the imports
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.max_workers)))
+
+    async def close(self):
+        if self.started:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _discard(self, pool):
+        """Shut down `pool` and its workers; the next render starts a fresh one."""
+        # Another job may have already replaced it
+        if self._pool is not pool:
+            return
+        self._pool = None
+        # Running jobs aren't cancelled by shutdown, so stop their workers too
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, df, title):
+        if not self.started:
+            await self.start()
+        if self.pending >= self.max_pending:
+            raise RendererBusy("I'm drawing a lot of charts right now. Please try again in a few seconds.")
+
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            future = pool.submit(_render, df, title)
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise RenderError('Chart rendering failed. Please try again.') from None
+        self.pending += 1
+        # Count the job until the worker is actually done with it, even if we stop waiting
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._job_done))
+        try:
+            with metrics.timer('render'):
+                png, seconds = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._discard(pool)
+            raise RenderTimeout('Chart rendering timed out. Please try again.') from None
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for using too much memory), which breaks the whole pool
+            self._discard(pool)
+            raise RenderError('Chart rendering failed. Please try again.') from None
+        metrics.observe('plot', seconds)
+        return png
+
+    def _job_done(self):
+        self.pending -= 1
@@ -0,0 +1,499 @@
+"""reo-bot's client, commands and the services behind them.
+
+Importing this module sets everything up without connecting to Discord;
+app.py is the entry point that runs it.
+"""
+from dotenv import load_dotenv
+import os
+import math
+import re
+import json
+import time
+import discord
+from discord.ext import commands
+from io import BytesIO
+from alpha_vantage import ALPHA_VANTAGE_URL, AlphaVantageClient, AlphaVantageError, AlphaVantageThrottled
+from backends import SharedRateLimiter, SQLiteCache
+from cache import ChartCache, SingleFlight, TTLCache
+from charts import AUTO, INTERVALS, INTRADAY_INTERVALS, TIMEFRAMES, ChartError, build_chart, estimated_chart_wait, intraday_params, resolve_interval
+from metrics import metrics, serve as serve_metrics
+from renderer import ChartRenderer, RenderError
+from prefetch import DAILY, INTRADAY, INTRADAY_PARAMS, QUOTE, Prefetcher
+from ratelimit import RateLimiter
+from store import OHLCVStore
+from watch import CRYPTO, STOCK, WatchError, WatchManager
+
+# Load .env
+load_dotenv()
+ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
+DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+
+# Alpha Vantage call budget, shared by every command (the free tier allows 5 calls a minute)
+ALPHA_VANTAGE_CALLS_PER_MINUTE = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", 5))
+ALPHA_VANTAGE_CALLS_PER_DAY = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_DAY", 0)) or None
+
+# How many bot processes draw from that budget (launcher.py sets it). Background work, prefetching
+# and /watch polling, is split between them so together they stay within their share.
+BOT_PROCESSES = int(os.getenv("BOT_PROCESSES", 1))
+
+# When several bot processes run side by side (see launcher.py), CACHE_BACKEND=sqlite makes them
+# share one response cache and one Alpha Vantage call budget through SHARED_STATE_PATH
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "reo_state.sqlite3")
+
+if CACHE_BACKEND == "sqlite":
+    response_cache = SQLiteCache(SHARED_STATE_PATH)
+    limiter = SharedRateLimiter(SHARED_STATE_PATH, per_minute=ALPHA_VANTAGE_CALLS_PER_MINUTE, per_day=ALPHA_VANTAGE_CALLS_PER_DAY)
+else:
+    response_cache = TTLCache(maxsize=512)
+    limiter = RateLimiter(per_minute=ALPHA_VANTAGE_CALLS_PER_MINUTE, per_day=ALPHA_VANTAGE_CALLS_PER_DAY)
+
+# Shared Alpha Vantage client, its session is opened in on_ready
+alpha_vantage = AlphaVantageClient(
+    ALPHA_VANTAGE_API_KEY,
+    cache=response_cache,
+    limiter=limiter,
+    # REALTIME_BULK_QUOTES needs a premium key, without it /quotes makes one pooled call per symbol
+    bulk_quotes=os.getenv("ALPHA_VANTAGE_BULK_QUOTES", "").lower() in ("1", "true", "yes"),
+    # Only for pointing the bot at a local stand-in, see benchmarks/fake_alpha_vantage.py
+    url=os.getenv("ALPHA_VANTAGE_URL", ALPHA_VANTAGE_URL),
+)
+
+# Charts are drawn in worker processes so mplfinance never blocks the event loop
+renderer = ChartRenderer()
+
+# Rendered charts are reused until a newer bar arrives, optionally persisted to CHART_CACHE_DIR.
+# Processes sharing a backend also share rendered charts through that directory.
+chart_cache = ChartCache(directory=os.getenv("CHART_CACHE_DIR") or (".chart_cache" if CACHE_BACKEND == "sqlite" else None))
+
+# Local daily bar history, seeded once per symbol and then only topped up
+ohlcv_store = OHLCVStore(os.getenv("OHLCV_DB_PATH", "ohlcv.sqlite3"))
+
+# Refreshes the most requested symbols in the background with spare Alpha Vantage calls
+prefetcher = Prefetcher(alpha_vantage, ohlcv_store, processes=BOT_PROCESSES)
+
+# Latency histograms and counters are always kept for /stats. Set METRICS_PORT to also
+# serve them at http://<host>:METRICS_PORT/metrics for Prometheus to scrape.
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0)) or None
+metrics_server = None
+
+# /stats covers every server the bot is in, so only these Discord user IDs (comma separated)
+# may run it. Without STATS_USER_IDS it falls back to the bot's owner.
+STATS_USER_IDS = {int(user_id) for user_id in os.getenv("STATS_USER_IDS", "").split(",") if user_id.strip()}
+
+# Sharding: SHARD_COUNT is the total number of shards ('auto' lets Discord pick) and
+# SHARD_IDS the ones this process runs. Without SHARD_COUNT the bot runs unsharded.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()] or None
+
+class ReoBot(discord.AutoShardedBot if SHARD_COUNT else discord.Bot):
+    async def on_application_command_error(self, context, exception):
+        # Count errors the commands didn't handle themselves, then report them as usual
+        metrics.count('error')
+        await super().on_application_command_error(context, exception)
+
+    async def close(self):
+        # Stop background work and release the pooled HTTP session and renderer workers before disconnecting
+        await prefetcher.stop()
+        await watcher.stop()
+        await alpha_vantage.close()
+        await renderer.close()
+        ohlcv_store.close()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await super().close()
+
+if SHARD_COUNT:
+    bot = ReoBot(
+        shard_count=None if SHARD_COUNT == "auto" else int(SHARD_COUNT),
+        shard_ids=SHARD_IDS,
+        # Slash commands are global, so only the process running shard 0 registers them
+        auto_sync_commands=SHARD_IDS is None or 0 in SHARD_IDS,
+    )
+else:
+    bot = ReoBot()
+
+# /watch polls each watched symbol once per interval, however many channels follow it.
+# Polls may use at most half of the per-minute and per-day call budgets (split between
+# processes), which caps how many symbols can be watched.
+WATCH_INTERVAL = int(os.getenv("WATCH_INTERVAL", 60))
+WATCH_MAX_SYMBOLS = ALPHA_VANTAGE_CALLS_PER_MINUTE * WATCH_INTERVAL // (120 * BOT_PROCESSES)
+if ALPHA_VANTAGE_CALLS_PER_DAY:
+    # Sized for crypto, which is polled around the clock
+    WATCH_MAX_SYMBOLS = min(WATCH_MAX_SYMBOLS, ALPHA_VANTAGE_CALLS_PER_DAY * WATCH_INTERVAL // (2 * 24 * 60 * 60 * BOT_PROCESSES))
+
+# Let people know when their request is queued behind the Alpha Vantage rate limit
+def wait_note(seconds):
+    if seconds < 5:
+        return ''
+    return f' Alpha Vantage is busy, so this may take about {math.ceil(seconds)} seconds.'
+
+def throttled_message(e):
+    return f'Alpha Vantage rate limit reached. Please try again in about {math.ceil(e.retry_after)} seconds.'
+
+@bot.event
+async def on_ready():
+    global metrics_server
+    await alpha_vantage.start()
+    await renderer.start()
+    prefetcher.start()
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = await serve_metrics(METRICS_PORT)
+    print(f'We have logged in as {bot.user}')
+
+# Every slash command is timed from here until it returns, and everything it does on the way
+# (Alpha Vantage calls, parsing, rendering, uploads) is recorded against its name and symbol
+@bot.before_invoke
+async def start_timing(ctx):
+    options = {option['name']: option.get('value') for option in ctx.selected_options or []}
+    metrics.start_command(ctx.command.qualified_name, str(options.get('symbol', '')).upper())
+
+@bot.after_invoke
+async def stop_timing(ctx):
+    metrics.finish_command()
+
+@bot.slash_command(name="help", description="Learn more about reo-bot and its commands") 
+async def help(ctx):
+    embed = discord.Embed(title="I'm `reo-bot`, nice to meet you! 👋", description="I can provide real-time financial charts and ticker data for stocks and assets.", color=discord.Colour.blurple())
+    embed.add_field(name="`/help`", value="View all commands", inline=False)
+    embed.add_field(name="`/info`", value="Get information about a stock.", inline=False)
+    embed.add_field(name="`/watch`", value="Follow a price in a message that updates itself.", inline=False)
+    embed.add_field(name="`/unwatch`", value="Stop following a price.", inline=False)
+    embed.add_field(name="`/crypto_price`", value="Get the current price of a cryptocurrency.", inline=False)
+    embed.add_field(name="`/stock_price`", value="Get the current price of a stock.", inline=False)
+    embed.add_field(name="`/quotes`", value="Get the current prices of several stocks at once.", inline=False)
+    embed.add_field(name="`/chart`", value="Generate a chart for a given symbol over a timeframe, with candles of any interval.", inline=False)
+    embed.add_field(name="`/day_chart`", value="Generate the latest intraday chart for a given symbol.", inline=False)
+    embed.add_field(name="`/week_chart`", value="Generate this week's chart for a given symbol.", inline=False)
+    embed.add_field(name="`/month_chart`", value="Generate the latest month chart for a given symbol.", inline=False)
+    embed.add_field(name="`/year_chart`", value="Generate the latest year chart for a given symbol.", inline=False)
+    embed.add_field(name="`/stats`", value="View response times and cache statistics (bot operators only).", inline=False)
+    embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    embed.set_footer(text="Fun fact: I'm named after Reo Mikage from the anime Blue Lock, hence the chameleon icon!")
+    await ctx.respond(embed=embed)
+
+# Command for getting the current price of a cryptocurrency
+@bot.slash_command(name='crypto_price', description='Get the current price of a cryptocurrency')
+async def crypto_price (
+    ctx,
+    symbol: str = discord.Option(description="The cryptocurrency symbol to get data for, e.g. 'BTC' for Bitcoin")
+):
+    await ctx.respond(f'Fetching the current price of {symbol.upper()}...{wait_note(alpha_vantage.estimated_wait("CURRENCY_EXCHANGE_RATE", from_currency=symbol.upper(), to_currency="USD"))}')
+    # Get financial data
+    try:
+        data = await alpha_vantage.query('CURRENCY_EXCHANGE_RATE', from_currency=symbol.upper(), to_currency='USD')
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e))
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching cryptocurrency price. Please try again.')
+        return
+    else:
+        if 'Error Message' in data:
+            await ctx.respond('Invalid inputs in cryptocurrency price command. Please enter a valid symbol.')
+        else:
+            # Get cryptocurrency price
+            price = data.get('Realtime Currency Exchange Rate', {}).get('5. Exchange Rate')
+            if not price:
+                await ctx.respond('No data available for the given symbol.')
+                return
+
+            embed = discord.Embed(title=f'Current Price of {symbol.upper()}', description=f'The current price of {symbol.upper()} is ${"{:.2f}".format(round(float(price),2))}.', color=discord.Colour.blurple())
+            embed.add_field(name='Learn More', value=f'[View more information about {symbol.upper()}](https://www.tradingview.com/symbols/{symbol.upper()}USD)', inline=False)
+            embed.set_footer(text='Data provided by Alpha Vantage')
+            embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+
+            await ctx.respond(embed=embed)
+
+# Command for getting the current price of a stock
+@bot.slash_command(name='stock_price', description='Get the current price of a stock')
+async def stock_price (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple")
+):
+    await ctx.respond(f'Fetching the current price of {symbol.upper()}...{wait_note(alpha_vantage.estimated_wait("GLOBAL_QUOTE", symbol=symbol.upper()))}')
+    prefetcher.record(QUOTE, symbol.upper())
+    # Get financial data
+    try:
+        data = await alpha_vantage.query('GLOBAL_QUOTE', symbol=symbol.upper())
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e))
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching stock price. Please try again.')
+        return
+    else:
+        if 'Error Message' in data:
+            await ctx.respond('Invalid inputs in stock price command. Please enter a valid symbol.')
+        else:
+            # Get stock price
+            price = data.get('Global Quote', {}).get('05. price')
+            if not price:
+                await ctx.respond('No data available for the given symbol.')
+                return
+
+            embed = discord.Embed(title=f'Current Price of {symbol.upper()}', description=f'The current price of {symbol.upper()} is ${"{:.2f}".format(round(float(price),2))}.', color=discord.Colour.blurple())
+            embed.add_field(name='Learn More', value=f'[View more information about {symbol.upper()}](https://www.tradingview.com/symbols/{symbol.upper()})', inline=False)
+            embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+            embed.set_footer(text='Data provided by Alpha Vantage')
+
+            await ctx.respond(embed=embed)
+
+# Discord embeds can hold at most 25 fields
+MAX_QUOTES = 25
+
+# Command for getting the current prices of several stocks at once
+@bot.slash_command(name='quotes', description='Get the current prices of several stocks at once')
+async def quotes (
+    ctx,
+    symbols: str = discord.Option(description="Stock symbols separated by spaces or commas, e.g. 'AAPL MSFT TSLA'")
+):
+    # Split on spaces and commas, dropping duplicates but keeping the order they were typed in
+    symbols = list(dict.fromkeys(s for s in re.split(r'[\s,]+', symbols.upper()) if s))
+    if not symbols:
+        await ctx.respond('Please enter at least one stock symbol.')
+        return
+    skipped = symbols[MAX_QUOTES:]
+    symbols = symbols[:MAX_QUOTES]
+
+    await ctx.respond(f'Fetching the current prices of {", ".join(symbols)}...{wait_note(alpha_vantage.estimated_quotes_wait(symbols))}')
+    for symbol in symbols:
+        prefetcher.record(QUOTE, symbol)
+    try:
+        results = await alpha_vantage.quotes(symbols)
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e))
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching stock prices. Please try again.')
+        return
+
+    embed = discord.Embed(title='Current Prices', color=discord.Colour.blurple())
+    for symbol in symbols:
+        result = results.get(symbol)
+        if isinstance(result, AlphaVantageThrottled):
+            value = f'Rate limited, retry in {math.ceil(result.retry_after)}s'
+        elif isinstance(result, Exception):
+            value = 'Error fetching price'
+        else:
+            price = (result or {}).get('05. price')
+            value = f'[${"{:.2f}".format(round(float(price),2))}](https://www.tradingview.com/symbols/{symbol})' if price else 'No data available'
+        embed.add_field(name=symbol, value=value, inline=True)
+    if skipped:
+        embed.description = f'Only the first {MAX_QUOTES} symbols are shown, skipped {", ".join(skipped)}.'
+    embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+    embed.set_footer(text='Data provided by Alpha Vantage')
+    await ctx.respond(embed=embed)
+
+# Concurrent requests for the same chart share one fetch and one rendered PNG
+chart_flights = SingleFlight()
+
+async def send_chart(ctx, symbol, timeframe, interval=AUTO):
+    try:
+        interval = resolve_interval(timeframe, interval)
+    except ChartError as e:
+        await ctx.respond(str(e))
+        return
+
+    await ctx.respond(f'Fetching the latest {timeframe} chart for {symbol}...{wait_note(estimated_chart_wait(alpha_vantage, ohlcv_store, symbol, timeframe, interval))}')
+    if interval not in INTRADAY_INTERVALS:
+        prefetcher.record(DAILY, symbol)
+    elif intraday_params(timeframe, interval) == INTRADAY_PARAMS:
+        prefetcher.record(INTRADAY, symbol)
+
+    try:
+        png = await chart_flights.do((symbol, timeframe, interval), lambda: build_chart(alpha_vantage, ohlcv_store, renderer, symbol, timeframe, interval, cache=chart_cache))
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e))
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching chart data. Please try again.')
+        return
+    except (ChartError, RenderError) as e:
+        metrics.count('chart_error')
+        await ctx.respond(str(e))
+        return
+
+    # Send to discord channel
+    embed = discord.Embed(title=f'Latest {timeframe.capitalize()} Chart for {symbol}', description=f'Here is the latest {timeframe} chart for {symbol}, with {interval} candles.', color=discord.Colour.blurple())
+    embed.add_field(name='Learn More', value=f'[View more information about {symbol}](https://www.tradingview.com/symbols/{symbol})', inline=False)
+    embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+    embed.set_image(url=f"attachment://{symbol}_chart.png")
+    embed.set_footer(text='Data provided by Alpha Vantage')
+    with metrics.timer('upload'):
+        await ctx.send(embed=embed, file=discord.File(BytesIO(png), f"{symbol}_chart.png"))
+
+# Command for generating a chart over any timeframe, with candles of any interval
+@bot.slash_command(name='chart', description='Generate a chart for a given symbol over a timeframe')
+async def chart (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple"),
+    timeframe: str = discord.Option(description="How far back the chart goes", choices=list(TIMEFRAMES), default='day'),
+    interval: str = discord.Option(description="How much time each candle covers, 'auto' picks one that suits the timeframe", choices=[AUTO, *INTERVALS], default=AUTO)
+):
+    await send_chart(ctx, symbol.upper(), timeframe, interval)
+
+# The per-timeframe commands are shortcuts for /chart
+@bot.slash_command(name='day_chart', description='Generate the latest intraday chart for a given symbol and function')
+async def day_chart (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple")
+):
+    await send_chart(ctx, symbol.upper(), 'day')
+
+@bot.slash_command(name='week_chart', description='Generate the latest week chart for a given symbol and function')
+async def week_chart (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple")
+):
+    await send_chart(ctx, symbol.upper(), 'week')
+
+@bot.slash_command(name='month_chart', description='Generate the latest month chart for a given symbol and function')
+async def month_chart (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple")
+):
+    await send_chart(ctx, symbol.upper(), 'month')
+
+@bot.slash_command(name='year_chart', description='Generate the latest year chart for a given symbol and function')
+async def year_chart (
+    ctx,
+    symbol: str = discord.Option(description="The stock symbol to get data for, e.g. 'AAPL' for Apple")
+):
+    await send_chart(ctx, symbol.upper(), 'year')
+
+# Embed for the live price messages posted by /watch
+def watch_embed(market, symbol, price):
+    link = f'https://www.tradingview.com/symbols/{symbol}USD' if market == CRYPTO else f'https://www.tradingview.com/symbols/{symbol}'
+    embed = discord.Embed(title=f'Watching {symbol}', description=f'The current price of {symbol} is ${"{:.2f}".format(round(float(price),2))}.', color=discord.Colour.blurple(), timestamp=discord.utils.utcnow())
+    embed.add_field(name='Learn More', value=f'[View more information about {symbol}]({link})', inline=False)
+    embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+    embed.set_footer(text=f'Updates every {WATCH_INTERVAL} seconds. Data provided by Alpha Vantage')
+    return embed
+
+watcher = WatchManager(alpha_vantage, watch_embed, interval=WATCH_INTERVAL, max_symbols=WATCH_MAX_SYMBOLS)
+
+# Command for following a price in a message that keeps itself up to date
+@bot.slash_command(name='watch', description='Follow the price of a stock or cryptocurrency in this channel')
+async def watch (
+    ctx,
+    symbol: str = discord.Option(description="The symbol to watch, e.g. 'AAPL' for Apple or 'BTC' for Bitcoin"),
+    market: str = discord.Option(description="Whether the symbol is a stock or a cryptocurrency", choices=[STOCK, CRYPTO], default=STOCK)
+):
+    if ctx.channel is None:
+        await ctx.respond('I can only watch prices in a channel I can post in.', ephemeral=True)
+        return
+
+    await ctx.defer(ephemeral=True)
+    try:
+        await watcher.subscribe(ctx.channel, market, symbol.upper())
+    except WatchError as e:
+        await ctx.respond(str(e), ephemeral=True)
+        return
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e), ephemeral=True)
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching the price to watch. Please try again.', ephemeral=True)
+        return
+    except discord.Forbidden:
+        await ctx.respond("I don't have permission to post in this channel.", ephemeral=True)
+        return
+
+    await ctx.respond(f'Watching {symbol.upper()} in this channel. Use `/unwatch` to stop.', ephemeral=True)
+
+# Command for stopping a /watch
+@bot.slash_command(name='unwatch', description='Stop following the price of a stock or cryptocurrency in this channel')
+async def unwatch (
+    ctx,
+    symbol: str = discord.Option(description="The symbol to stop watching"),
+    market: str = discord.Option(description="Whether the symbol is a stock or a cryptocurrency", choices=[STOCK, CRYPTO], default=STOCK)
+):
+    if ctx.channel is not None and watcher.unsubscribe(ctx.channel.id, market, symbol.upper()):
+        await ctx.respond(f'Stopped watching {symbol.upper()} in this channel.', ephemeral=True)
+    else:
+        await ctx.respond(f'{symbol.upper()} is not being watched in this channel.', ephemeral=True)
+
+@bot.slash_command(name='info', description='Get information about a stock.')
+async def info(ctx, symbol: str=discord.Option(description="The stock symbol to get information for, e.g. 'AAPL' for Apple")):
+
+    await ctx.respond(f'Fetching information for {symbol.upper()}...{wait_note(alpha_vantage.estimated_wait("OVERVIEW", symbol=symbol.upper(), outputsize="compact"))}')
+
+    # Fetch from alpha vantage API
+    try:
+        data = await alpha_vantage.query('OVERVIEW', symbol=symbol.upper(), outputsize='compact')
+    except AlphaVantageThrottled as e:
+        await ctx.respond(throttled_message(e))
+        return
+    except AlphaVantageError:
+        await ctx.respond('Error fetching info data. Please try again.')
+        return
+    else:
+        if 'Error Message' in data:
+            await ctx.respond('Invalid inputs in info command. Please enter a valid symbol.')
+        else:
+            # Access data from the dictionary
+            company_name = data.get('Name', 'N/A')
+            sector = data.get('Sector', 'N/A')
+            market_cap = data.get('MarketCapitalization', 'N/A')
+            pe_ratio = data.get('PERatio', 'N/A')
+            eps = data.get('EPS', 'N/A')
+            dividend_per_share = data.get('DividendPerShare', 'N/A')
+            dividend_yield = data.get('DividendYield', 'N/A')
+            week_52_high = data.get('52WeekHigh', 'N/A')
+            week_52_low = data.get('52WeekLow', 'N/A')
+            website = data.get('OfficialSite', 'N/A') 
+
+            # Create an embed to display information
+            embed = discord.Embed(title=f'{company_name}', color=discord.Colour.blurple())
+            embed.add_field(name='Sector', value=sector.capitalize(), inline=False)
+            embed.add_field(name='Market Cap', value=f"${int(market_cap):,}" if market_cap != "N/A" else market_cap , inline=False)
+            embed.add_field(name='P/E Ratio', value=pe_ratio, inline=False)
+            embed.add_field(name='EPS', value=eps, inline=False)
+            embed.add_field(name='Dividend Per Share', value=f"${dividend_per_share}", inline=False)
+            embed.add_field(name='Dividend Yield', value='{:.2%}'.format(float(dividend_yield)) if dividend_yield != "N/A" else dividend_yield, inline=False)
+            embed.add_field(name='52 Week High', value=f"${week_52_high}", inline=False)
+            embed.add_field(name='52 Week Low', value=f"${week_52_low}", inline=False)
+            embed.add_field(name='Website', value=f'[Official Website for {company_name}]({website})', inline=False)
+            embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+            embed.set_footer(text='Data provided by Alpha Vantage')
+            await ctx.respond(embed=embed)
+
+# Command for checking where time goes, for the people running the bot
+@bot.slash_command(name='stats', description='View response times and cache statistics')
+@discord.default_permissions(administrator=True)
+@discord.guild_only()
+async def stats(ctx):
+    if not (ctx.author.id in STATS_USER_IDS if STATS_USER_IDS else await bot.is_owner(ctx.author)):
+        await ctx.respond('Only the people running reo-bot can view its stats.', ephemeral=True)
+        return
+
+    embed = discord.Embed(title='reo-bot Stats', description=f'Up for {format_duration(time.time() - metrics.started_at)}. Times are p50 / p99.', color=discord.Colour.blurple())
+
+    # One field per command, with its total time and then each stage it spent time in
+    commands_seen = sorted({command for command, stage in metrics.histograms if stage == 'total'})
+    for command in commands_seen[:20]:
+        total = metrics.histograms[(command, 'total')]
+        lines = [f'{total.count} runs, {format_ms(total.quantile(0.5))} / {format_ms(total.quantile(0.99))}']
+        for (name, stage), histogram in sorted(metrics.histograms.items()):
+            if name == command and stage != 'total':
+                lines.append(f'{stage}: {format_ms(histogram.quantile(0.5))} / {format_ms(histogram.quantile(0.99))}')
+        embed.add_field(name=f'/{command}', value='\n'.join(lines), inline=True)
+
+    response_stats = alpha_vantage.cache.stats()
+    chart_stats = chart_cache.stats()
+    embed.add_field(name='Caches', value=f'Responses: {response_stats["hits"]} hits, {response_stats["misses"]} misses\nCharts: {chart_stats["hits"]} hits, {chart_stats["misses"]} misses', inline=False)
+    events = {event: sum(metrics.event_totals(event).values()) for event in ('throttled', 'upstream_error', 'chart_error', 'error')}
+    embed.add_field(name='Problems', value=f'Throttled: {events["throttled"]}\nAlpha Vantage errors: {events["upstream_error"]}\nChart errors: {events["chart_error"]}\nUnhandled errors: {events["error"]}', inline=False)
+    embed.set_author(name="reo-bot", icon_url=bot.user.display_avatar.url)
+    embed.set_footer(text='The attached file has every histogram in the Prometheus text format')
+
+    await ctx.respond(embed=embed, file=discord.File(BytesIO(metrics.render().encode()), 'metrics.txt'), ephemeral=True)
+
+def format_ms(seconds):
+    return f'{seconds * 1000:.0f}ms' if seconds < 1 else f'{seconds:.1f}s'
+
+def format_duration(seconds):
+    hours, seconds = divmod(int(seconds), 3600)
+    return f'{hours}h {seconds // 60}m'
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+class OHLCVStore:
+    """Daily OHLCV bars per symbol, persisted in SQLite.
+
+    Bars are clustered on (symbol, date), so slicing any date range out of a
+    symbol's history is an index seek rather than a scan. Dates are stored as
+    ISO `YYYY-MM-DD` strings, which sort chronologically.
+    """
+
+    def __init__(self, path='ohlcv.sqlite3'):
+        self.path = path
+        # WAL lets several bot processes read the store while one of them writes
+        self._conn = sqlite3.connect(path, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def has_symbol(self, symbol):
+        return self.checked_at(symbol) is not None
+
+    def checked_at(self, symbol):
+        """When `symbol` was last synced with Alpha Vantage (epoch seconds), or None."""
+        row = self._conn.execute('SELECT checked_at FROM symbols WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def latest_date(self, symbol):
+        row = self._conn.execute('SELECT MAX(date) FROM bars WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0]
+
+    def upsert(self, symbol, rows):
+        """Insert or replace `(date, open, high, low, close, volume)` rows and mark `symbol` as synced."""
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO bars (symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((symbol, *row) for row in rows),
+            )
+            self._conn.execute('INSERT OR REPLACE INTO symbols (symbol, checked_at) VALUES (?, ?)', (symbol, time.time()))
+
+    def range(self, symbol, start, end):
+        """Return the `(date, open, high, low, close, volume)` rows with `start <= date <= end`, oldest first."""
+        return self._conn.execute(
+            'SELECT date, open, high, low, close, volume FROM bars WHERE symbol = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (symbol, start, end),
+        ).fetchall()
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import discord
+from alpha_vantage import AlphaVantageError
+from prefetch import market_open
+from ratelimit import BACKGROUND_PRIORITY
+
+log = logging.getLogger(__name__)
+
+STOCK = 'stock'
+CRYPTO = 'crypto'
+
+
+class WatchError(Exception):
+    """Raised with a user-facing message when a watch can't be started."""
+
+
+class WatchManager:
+    """Live price messages that are edited in place instead of re-posted.
+
+    Every (market, symbol) pair has a single poller, shared by all channels
+    watching it across every guild. Each poll makes one quote lookup, and if
+    the price moved, each channel's message is edited with an embed from
+    `make_embed(market, symbol, price)`. Upstream cost grows with the number
+    of distinct symbols, not with the number of watchers, so at most
+    `max_symbols` of them are watched at once. Polls queue behind every user
+    request, and stocks aren't polled while the market is closed.
+    """
+
+    def __init__(self, client, make_embed, interval=60, max_per_channel=5, max_symbols=None):
+        self.client = client
+        self.make_embed = make_embed
+        self.interval = interval
+        self.max_per_channel = max_per_channel
+        self.max_symbols = max_symbols
+        self._messages = {}  # (market, symbol) -> {channel_id: discord.Message}
+        self._prices = {}  # (market, symbol) -> last price shown
+        self._pollers = {}  # (market, symbol) -> asyncio.Task
+        self._subscribing = set()  # ((market, symbol), channel_id) of watches still posting their first message
+
+    def watching(self, channel_id):
+        return [key for key, messages in self._messages.items() if channel_id in messages] + [key for key, c in self._subscribing if c == channel_id]
+
+    async def subscribe(self, channel, market, symbol):
+        key = (market, symbol)
+        if key in self.watching(channel.id):
+            raise WatchError(f'{symbol} is already being watched in this channel.')
+        if len(self.watching(channel.id)) >= self.max_per_channel:
+            raise WatchError(f'This channel is already watching {self.max_per_channel} symbols. Use `/unwatch` to stop one first.')
+        if self.max_symbols == 0:
+            raise WatchError("Watching prices is turned off, there aren't enough Alpha Vantage calls to spare for it.")
+        watched = set(self._messages) | {k for k, _ in self._subscribing}
+        if key not in watched and self.max_symbols is not None and len(watched) >= self.max_symbols:
+            raise WatchError("I'm already watching as many symbols as I can keep up with. Please try one that's already being watched, or try again later.")
+
+        # Claim the watch before waiting on anything, so the same command run twice only posts once
+        self._subscribing.add((key, channel.id))
+        try:
+            price = self._prices.get(key)
+            if price is None:
+                price = await self._price(key)
+                if price is None:
+                    raise WatchError('No data available for the given symbol.')
+                self._prices[key] = price
+
+            message = await channel.send(embed=self.make_embed(market, symbol, price))
+        finally:
+            self._subscribing.discard((key, channel.id))
+        self._messages.setdefault(key, {})[channel.id] = message
+        if key not in self._pollers:
+            self._pollers[key] = asyncio.create_task(self._poll(key))
+
+    def unsubscribe(self, channel_id, market, symbol):
+        key = (market, symbol)
+        if self._messages.get(key, {}).pop(channel_id, None) is None:
+            return False
+        if not self._messages[key]:
+            self._forget(key)
+        return True
+
+    async def stop(self):
+        pollers = list(self._pollers.values())
+        for key in list(self._messages):
+            self._forget(key)
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+    def _forget(self, key):
+        self._messages.pop(key, None)
+        self._prices.pop(key, None)
+        poller = self._pollers.pop(key, None)
+        if poller is not None and poller is not asyncio.current_task():
+            poller.cancel()
+
+    async def _price(self, key, priority=None):
+        market, symbol = key
+        if market == CRYPTO:
+            data = await self.client.query('CURRENCY_EXCHANGE_RATE', priority=priority, from_currency=symbol, to_currency='USD')
+            return data.get('Realtime Currency Exchange Rate', {}).get('5. Exchange Rate')
+        data = await self.client.query('GLOBAL_QUOTE', priority=priority, symbol=symbol)
+        return data.get('Global Quote', {}).get('05. price')
+
+    async def _poll(self, key):
+        while self._messages.get(key):
+            await asyncio.sleep(self.interval)
+            # Stock prices can't move outside market hours, crypto trades around the clock
+            if key[0] == STOCK and not market_open():
+                continue
+            try:
+                price = await self._price(key, priority=BACKGROUND_PRIORITY)
+            except AlphaVantageError as e:
+                log.warning('Polling %s %s failed: %s', *key, e)
+                continue
+            if price is None or price == self._prices.get(key):
+                continue
+            self._prices[key] = price
+
+            embed = self.make_embed(*key, price)
+            messages = list(self._messages.get(key, {}).items())
+            results = await asyncio.gather(*(message.edit(embed=embed) for _, message in messages), return_exceptions=True)
+            for (channel_id, _), result in zip(messages, results):
+                # The message was deleted or we lost access to the channel, so stop updating it
+                if isinstance(result, (discord.NotFound, discord.Forbidden)):
+                    self._messages.get(key, {}).pop(channel_id, None)
+                elif isinstance(result, Exception):
+                    log.warning('Updating %s %s in channel %s failed: %s', *key, channel_id, result)
+
+        self._forget(key)